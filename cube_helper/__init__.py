@@ -6,6 +6,9 @@
 __version__ = '2.2.3'
 
 from cube_helper.cube_help import (load,
+                                   iter_load,
+                                   load_incremental,
+                                   load_many,
                                    add_categorical,
                                    aggregate_categorical,
                                    extract_categorical,
@@ -14,7 +17,14 @@ from cube_helper.cube_help import (load,
 from cube_helper.cube_loader import (load_from_dir,
                                      load_from_filelist,
                                      sort_by_earliest_date,
-                                     file_sort_by_earliest_date)
+                                     file_sort_by_earliest_date,
+                                     parse_filename_dates,
+                                     first_time_order,
+                                     iter_files,
+                                     configure_cube_cache,
+                                     clear_cube_cache,
+                                     configure_file_pool,
+                                     close_file_pool)
 from cube_helper.cube_equaliser import (examine_dim_bounds,
                                         equalise_time_units,
                                         equalise_attributes,
@@ -22,8 +32,22 @@ from cube_helper.cube_equaliser import (examine_dim_bounds,
                                         equalise_aux_coords,
                                         equalise_data_type,
                                         equalise_all,
+                                        equalise_to_cube,
                                         remove_attributes,
-                                        compare_cubes)
+                                        compare_cubes,
+                                        plan_equalisation,
+                                        EqualisationPlan,
+                                        save_plan,
+                                        load_plan)
+from cube_helper.async_loader import (aload,
+                                      aload_from_dir,
+                                      aload_from_filelist)
+from cube_helper.catalog import (Catalog,
+                                 build_catalog)
 from cube_helper.fix_known import fix_known_issues
+from cube_helper.result_cache import ResultCache
+from cube_helper.reference import (save_reference,
+                                   load_reference,
+                                   extend_reference)
 from cube_helper.logger import (muffle_logger,
                                 reset_logger)
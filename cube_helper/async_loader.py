@@ -0,0 +1,182 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+"""
+Asyncio counterparts of the cube_helper loaders.
+
+Directory walking, header reads and file loads all run on an executor so
+the event loop is never blocked. Files are handed to at most
+``concurrency`` worker tasks, so no more than that many are in flight
+however many files there are. The netCDF library is not thread-safe, so
+the netCDF reads themselves are serialised on the executor's threads.
+Cancelling the awaiting task cancels every file load that has not
+started yet.
+"""
+import asyncio
+from functools import partial
+
+from cube_helper.cube_loader import (_check_sort,
+                                     _dir_paths,
+                                     _filelist_paths,
+                                     _load_path,
+                                     _order_loaded)
+from cube_helper.cube_help import _equalise_and_concatenate
+
+
+async def _aload_paths(paths, constraint, concurrency, executor, sort,
+                       preloaded=None):
+    """
+    Loads paths on executor with at most concurrency worker tasks, each
+    taking the next path once its previous file has been read, and
+    returns the sorted cubes and their files. Files with raw cubes in
+    preloaded are not read again.
+    """
+    preloaded = preloaded or {}
+    loop = asyncio.get_event_loop()
+    load = partial(_load_path, constraint=constraint)
+    remaining = iter(enumerate(paths))
+    results = {}
+
+    async def worker():
+        for index, path in remaining:
+            cubes = await loop.run_in_executor(
+                executor, partial(load, path, raw_cubes=preloaded.get(path)))
+            results[index] = (path, cubes)
+
+    workers = [asyncio.ensure_future(worker())
+               for _ in range(max(1, min(concurrency, len(paths))))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        raise
+    return _order_loaded([results[index] for index in sorted(results)],
+                         sort)
+
+
+async def aload_from_dir(directory, filetype, constraint=None, concurrency=8,
+                         executor=None, catalog=None, filename_dates=None,
+                         sort='origin', recursive=False, include=None,
+                         exclude=None, max_depth=None):
+    """
+    Asynchronously loads a set of cubes from a given directory, as
+    cube_loader.load_from_dir() does.
+
+    Args:
+        directory: a chosen directory to operate on.
+
+        filetype: a string specifying the expected type of files found
+        in the dataset.
+
+        constraint (optional): an iris.Constraint to load the dataset
+        with.
+
+        concurrency (optional): the maximum number of files read at
+        once, 8 by default.
+
+        executor (optional): the concurrent.futures executor that files
+        are read on. None uses the event loop's default executor.
+
+        The remaining arguments are those of load_from_dir().
+
+    Returns:
+        loaded_cubes, cube_files: a list of the loaded Cubes and a list
+        of their respective filenames.
+    """
+    _check_sort(sort)
+    loop = asyncio.get_event_loop()
+
+    def find_paths():
+        paths, normalised, preloaded = _dir_paths(
+            directory, filetype, constraint, catalog, filename_dates,
+            recursive, include, exclude, max_depth)
+        return list(paths), normalised, preloaded
+
+    paths, constraint, preloaded = await loop.run_in_executor(executor,
+                                                              find_paths)
+    return await _aload_paths(paths, constraint, concurrency, executor,
+                              sort, preloaded)
+
+
+async def aload_from_filelist(paths, filetype, constraint=None,
+                              concurrency=8, executor=None,
+                              filename_dates=None, sort='origin'):
+    """
+    Asynchronously loads the specified files, as
+    cube_loader.load_from_filelist() does.
+
+    Args:
+        paths: a chosen list of filenames to operate on.
+
+        filetype: a string specifying the expected type of files found
+        in the dataset.
+
+        constraint (optional): an iris.Constraint to load the dataset
+        with.
+
+        concurrency (optional): the maximum number of files read at
+        once, 8 by default.
+
+        executor (optional): the concurrent.futures executor that files
+        are read on. None uses the event loop's default executor.
+
+        The remaining arguments are those of load_from_filelist().
+
+    Returns:
+        loaded_cubes, cube_files: a list of the loaded Cubes and a list
+        of their respective filenames.
+    """
+    _check_sort(sort)
+    loop = asyncio.get_event_loop()
+    paths, constraint = await loop.run_in_executor(
+        executor, partial(_filelist_paths, paths, filetype, constraint,
+                          filename_dates))
+    return await _aload_paths(paths, constraint, concurrency, executor,
+                              sort)
+
+
+async def aload(directory, filetype='.nc', constraints=None, concurrency=8,
+                executor=None, catalog=None, filename_dates=None,
+                sort='origin', recursive=False, include=None, exclude=None,
+                max_depth=None):
+    """
+    Asynchronously loads and concatenates Iris Cubes, as
+    cube_help.load() does, without blocking the event loop.
+
+    Args:
+        directory: A String specifying the directory of the Cubes you
+        wish to concatenate, or a list of filenames.
+
+        filetype: Extension of Iris Cubes to Load. set to '.nc' by default.
+
+        constraints: Any constraints to be applied to Cubes on load.
+
+        concurrency: The maximum number of files read at once, 8 by
+        default.
+
+        executor: The concurrent.futures executor that files are read on,
+        and that equalisation and concatenation run on. None uses the
+        event loop's default executor.
+
+        The remaining arguments are those of cube_help.load().
+
+    Returns:
+        result: A concatenated Iris Cube.
+    """
+    if isinstance(directory, str):
+        loaded_cubes, cube_files = await aload_from_dir(
+            directory, filetype, constraints, concurrency, executor,
+            catalog, filename_dates, sort, recursive, include, exclude,
+            max_depth)
+    elif isinstance(directory, list):
+        loaded_cubes, cube_files = await aload_from_filelist(
+            directory, filetype, constraints, concurrency, executor,
+            filename_dates, sort)
+    else:
+        return None
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        executor, _equalise_and_concatenate, loaded_cubes, cube_files)
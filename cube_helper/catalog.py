@@ -0,0 +1,258 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+"""
+A persistent metadata index of the files in a dataset directory.
+
+The index is stored as a JSON sidecar file in the directory itself. Each
+entry is keyed by the file's absolute path and records the file's size
+and modification time, so only files that have changed since the index
+was last written need to be opened again. Loads through the catalog
+index new files from the cubes they load, so no file is parsed twice.
+"""
+import json
+import os
+
+import cf_units
+import numpy as np
+
+from cube_helper.logger import log_module
+
+CATALOG_FILENAME = '.cube_helper_catalog.json'
+CATALOG_VERSION = 1
+
+
+def _to_json_value(value):
+    """
+    Converts an attribute value to something that can be written to JSON.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _time_extent(time_coord):
+    """
+    Returns the first and last time of a time coordinate, using its
+    bounds where present, in the coordinate's own units.
+    """
+    if time_coord.has_bounds():
+        values = time_coord.bounds
+    else:
+        values = time_coord.points
+    return float(np.min(values)), float(np.max(values))
+
+
+def _cube_entry(cube):
+    """
+    Returns the catalog record for a single cube.
+    """
+    entry = {'var_name': cube.var_name,
+             'standard_name': cube.standard_name,
+             'long_name': cube.long_name,
+             'units': str(cube.units),
+             'shape': list(cube.shape),
+             'dtype': np.dtype(cube.dtype).str,
+             'attributes': {key: _to_json_value(value)
+                            for key, value in cube.attributes.items()},
+             'time_units': None,
+             'calendar': None,
+             'time_start': None,
+             'time_end': None}
+    for time_coord in cube.coords():
+        if time_coord.units.is_time_reference():
+            entry['time_units'] = time_coord.units.origin
+            entry['calendar'] = time_coord.units.calendar
+            entry['time_start'], entry['time_end'] = \
+                _time_extent(time_coord)
+            break
+    return entry
+
+
+def _date_key(value, time_units, calendar):
+    """
+    Converts a time value to a tuple that sorts correctly whatever the
+    time units and calendar of the file it came from.
+    """
+    date = cf_units.Unit(time_units, calendar).num2date(value)
+    return (date.year, date.month, date.day,
+            date.hour, date.minute, date.second)
+
+
+class Catalog(object):
+    """
+    An on-disk index of the header metadata of the files in a directory.
+
+    For each file the catalog records its size and modification time
+    alongside the var_name, standard_name, units, time units and calendar,
+    first and last time point, shape, dtype and attributes of every cube
+    it contains.
+
+    Args:
+        directory: the directory to index.
+
+        index_file (optional): where to store the index. Defaults to
+        a hidden file named ``.cube_helper_catalog.json`` in directory.
+    """
+    def __init__(self, directory, index_file=None):
+        self.directory = directory
+        if index_file is None:
+            index_file = os.path.join(directory, CATALOG_FILENAME)
+        self.index_file = index_file
+        self.entries = {}
+        self._read()
+
+    def _read(self):
+        try:
+            with open(self.index_file) as fh:
+                contents = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return
+        if contents.get('version') == CATALOG_VERSION:
+            self.entries = contents.get('entries', {})
+
+    def save(self):
+        """
+        Writes the index to disk. A directory that cannot be written to
+        leaves the index in memory only.
+        """
+        tmp_file = self.index_file + '.tmp'
+        try:
+            with open(tmp_file, 'w') as fh:
+                json.dump({'version': CATALOG_VERSION,
+                           'entries': self.entries}, fh)
+            os.replace(tmp_file, self.index_file)
+        except (IOError, OSError):
+            logger = log_module()
+            logger.info("Unable to write catalog {}\n".format(
+                self.index_file))
+
+    def is_current(self, path):
+        """
+        Checks whether the entry for path matches the file on disk.
+
+        Args:
+            path: the filename to check.
+
+        Returns:
+            True if path is indexed and its size and modification time
+            are unchanged.
+        """
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (entry['size'] == stat.st_size and
+                entry['mtime'] == stat.st_mtime)
+
+    def add(self, path, cubes):
+        """
+        Indexes a file from cubes already loaded from it, without opening
+        the file again. The index is not saved.
+
+        Args:
+            path: the filename the cubes were loaded from.
+
+            cubes: every cube loaded from path, without constraints.
+        """
+        stat = os.stat(path)
+        self.entries[os.path.abspath(path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'cubes': [_cube_entry(cube) for cube in cubes
+                      if isinstance(cube.standard_name, str)]}
+
+    def prune(self):
+        """
+        Drops the entries of files that no longer exist. Entries of
+        files outside any particular load are kept, so loads of
+        different subsets of a directory share one index.
+
+        Returns:
+            True if any entry was dropped.
+        """
+        missing = [path for path in self.entries
+                   if not os.path.exists(path)]
+        for path in missing:
+            del self.entries[path]
+        return bool(missing)
+
+    def update(self, paths):
+        """
+        Brings the index up to date for paths, opening only those files
+        that are new or have changed, and drops entries for files that
+        no longer exist. The index is saved if anything changed.
+
+        Args:
+            paths: the filenames that should be indexed.
+
+        Returns:
+            the catalog itself.
+        """
+        # Imported here, as cube_loader itself imports the catalog.
+        from cube_helper.cube_loader import _load_raw
+        changed = self.prune()
+        for path in paths:
+            if self.is_current(path):
+                continue
+            self.add(path, _load_raw(path))
+            changed = True
+        if changed:
+            self.save()
+        return self
+
+    def time_span(self, path):
+        """
+        Returns the earliest and latest time across the cubes in a file.
+
+        Args:
+            path: an indexed filename.
+
+        Returns:
+            a (start, end) tuple of date tuples, or None if the file
+            holds no cubes with a time coordinate.
+        """
+        spans = [(_date_key(cube['time_start'], cube['time_units'],
+                            cube['calendar']),
+                  _date_key(cube['time_end'], cube['time_units'],
+                            cube['calendar']))
+                 for cube in self.entries[os.path.abspath(path)]['cubes']
+                 if cube['time_units'] is not None]
+        if not spans:
+            return None
+        return (min(span[0] for span in spans),
+                max(span[1] for span in spans))
+
+
+def build_catalog(directory, filetype='.nc', index_file=None):
+    """
+    Builds, or refreshes, the metadata catalog of a directory. Only files
+    that are new or have changed since the catalog was last written are
+    opened.
+
+    Args:
+        directory: the directory to index.
+
+        filetype (optional): extension of the files to index, '.nc'
+        by default.
+
+        index_file (optional): where to store the index, defaults to
+        a hidden file in directory.
+
+    Returns:
+        the up to date Catalog.
+    """
+    catalog = Catalog(directory, index_file)
+    paths = sorted(os.path.join(directory, name)
+                   for name in os.listdir(directory)
+                   if name.endswith(filetype) and not name.startswith('.'))
+    return catalog.update(paths)
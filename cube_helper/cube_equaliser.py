@@ -6,11 +6,158 @@
 
 from __future__ import (absolute_import, division, print_function)
 import numpy as np
-from collections import namedtuple
-from itertools import combinations
+import hashlib
+import heapq
+import json
+import os
+from collections import Counter, OrderedDict, namedtuple
 from cube_helper.logger import log_module, log_inconsistent, log_coord_remove
 
-from iris.util import unify_time_units
+import cf_units
+import iris.coords
+
+PLAN_VERSION = 1
+
+
+def _array_token(array):
+    """
+    Returns a hashable token identifying the dtype, shape and contents of
+    a numpy array, without building its string representation.
+    """
+    array = np.ascontiguousarray(array)
+    return ('ndarray', array.dtype.str, array.shape,
+            hashlib.sha1(array.tobytes()).hexdigest())
+
+
+def _core_token(array):
+    """
+    Returns a token for the core points or bounds of a coord. Lazy arrays
+    are identified by their dtype, shape and dask name rather than being
+    computed, so only coords sharing one lazy array get equal tokens.
+    """
+    if hasattr(array, 'dask'):
+        return ('dask', np.dtype(array.dtype).str, array.shape, array.name)
+    return _array_token(array)
+
+
+def _attribute_token(value):
+    """
+    Returns a hashable token for an attribute value. Equal values give
+    equal tokens, as do arrays of the same dtype, shape and contents.
+    """
+    if isinstance(value, np.ndarray):
+        return _array_token(value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _uncommon_attributes(cubes):
+    """
+    Finds the attribute keys that are missing from, or hold a different
+    value on, at least one of cubes, counting each (key, value) pair in
+    a single pass.
+    """
+    counts = Counter()
+    n_cubes = 0
+    for cube in cubes:
+        n_cubes += 1
+        counts.update((key, _attribute_token(value))
+                      for key, value in cube.attributes.items())
+    return {key for (key, _), count in counts.items() if count != n_cubes}
+
+
+CubeFingerprint = namedtuple('CubeFingerprint', ['ndim', 'aux_coords',
+                                                 'dim_coords', 'attributes',
+                                                 'time_units'])
+
+
+def _digest(token):
+    return hashlib.sha1(repr(token).encode('utf-8')).hexdigest()
+
+
+def _attributes_token(attributes):
+    return tuple(sorted(((key, _attribute_token(value))
+                         for key, value in attributes.items()),
+                        key=lambda item: item[0]))
+
+
+def _coord_token(coord):
+    """
+    Returns a token of everything that coordinate equality compares:
+    names, units, attributes, coordinate system, and checksums of the
+    points and bounds. Lazy points and bounds are not loaded.
+    """
+    bounds = coord.core_bounds()
+    return (coord.name(), coord.standard_name, coord.long_name,
+            coord.var_name, str(coord.units), coord.units.calendar,
+            _attributes_token(coord.attributes), repr(coord.coord_system),
+            _core_token(coord.core_points()),
+            None if bounds is None else _core_token(bounds))
+
+
+def _cube_fingerprint(cube):
+    """
+    Builds a cheap metadata fingerprint of a cube, with a separate digest
+    for each of the parts that compare_cubes() examines. Cubes with equal
+    digests have equal metadata for that part.
+
+    Args:
+        cube: the iris Cube to fingerprint.
+
+    Returns:
+        a CubeFingerprint of the cube's ndim and the digests of its aux
+        coords, dim coords, attributes and time units.
+    """
+    time_units = None
+    time_coords = cube.coords('time')
+    if time_coords:
+        time_units = (str(time_coords[0].units),
+                      time_coords[0].units.calendar)
+    return CubeFingerprint(
+        ndim=cube.ndim,
+        aux_coords=_digest([_coord_token(c) for c in cube.aux_coords]),
+        dim_coords=_digest([_coord_token(c) for c in cube.dim_coords]),
+        attributes=_digest(_attributes_token(cube.attributes)),
+        time_units=_digest(time_units))
+
+
+def _differs(cubes, fingerprints, field, getter):
+    """
+    Groups cubes by one field of their fingerprints and checks whether
+    the group representatives differ in getter(cube).
+    """
+    representatives = OrderedDict()
+    for cube, fingerprint in zip(cubes, fingerprints):
+        representatives.setdefault(getattr(fingerprint, field), cube)
+    representatives = list(representatives.values())
+    first = getter(representatives[0])
+    return any(getter(cube) != first for cube in representatives[1:])
+
+
+def _layout_fingerprint(cubes):
+    """
+    Digests the parts of the cubes' metadata that an EqualisationPlan's
+    changes depend on: the number of cubes, and each cube's ndim,
+    attribute keys, aux coord names, dim coord names and metadata and
+    time units. Values that differ between otherwise alike datasets,
+    such as coord points, are left out.
+    """
+    layout = []
+    for cube in cubes:
+        layout.append((
+            cube.ndim,
+            sorted(cube.attributes),
+            sorted(coord.name() for coord in cube.aux_coords),
+            [(coord.name(), coord.standard_name, coord.long_name,
+              coord.var_name, _attributes_token(coord.attributes))
+             for coord in cube.dim_coords],
+            [(coord.name(), str(coord.units), coord.units.calendar)
+             for coord in cube.coords()
+             if coord.units.is_time_reference()]))
+    return _digest(layout)
 
 
 def equalise_attributes(cubes, comp_only=False):
@@ -31,23 +178,7 @@ def equalise_attributes(cubes, comp_only=False):
         Equalised cube_dataset to the CubeHelp class
 
     """
-    uncommon_keys = set()
-    attr_dict_list = []
-    attr_dict = {}
-    for cube in cubes:
-        for key, value in cube.attributes.items():
-            if isinstance(value, np.ndarray):
-                value = str(value)
-                attr_dict.update({key: value})
-            else:
-                attr_dict.update({key: value})
-        attr_dict_list.append(attr_dict.items())
-        attr_dict = {}
-    combs = list(combinations(attr_dict_list, 2))
-    for element in combs:
-        for key in set(element[0]) ^ set(element[1]):
-            uncommon_keys.add(key[0])
-
+    uncommon_keys = _uncommon_attributes(cubes)
     if not comp_only:
         for key in uncommon_keys:
             for cube in cubes:
@@ -61,10 +192,33 @@ def equalise_attributes(cubes, comp_only=False):
     return cubes
 
 
+def _convert_time_coord(time_coord, units):
+    """
+    Converts a time coordinate's points and bounds to float64 values in
+    units, which must share its calendar. The conversion between two
+    time reference units is linear, so it is applied with numpy (or dask,
+    for lazy coordinates) arithmetic rather than date by date.
+    """
+    offset, end = time_coord.units.convert(np.array([0., 1.]), units)
+    scale = end - offset
+
+    def convert(values):
+        values = values.astype('float64')
+        if time_coord.units != units:
+            values = values * scale + offset
+        return values
+
+    time_coord.points = convert(time_coord.core_points())
+    if time_coord.has_bounds():
+        time_coord.bounds = convert(time_coord.core_bounds())
+    time_coord.units = units
+
+
 def equalise_time_units(cubes, comp_only=False):
     """
     Equalises time units by cycling through each cube in the given CubeList
-    or list of loaded cubes.
+    or list of loaded cubes. Mismatches are found in a single pass over
+    the time coordinates, and each coordinate is then converted once.
 
     Args:
         cubes: Cubes to equalised of time coords.
@@ -81,57 +235,67 @@ def equalise_time_units(cubes, comp_only=False):
     change_messages = set()
     calendar = cubes[0].coord('time').units.calendar
     origin = cubes[0].coord('time').units.origin
-    for cube in cubes:
-        for time_coord in cube.coords():
-            if time_coord.units.is_time_reference():
-                if comp_only:
-                    if time_coord.units.calendar != calendar:
-                        comp_messages.add("\tcalendar format inconsistent\n")
-                    if time_coord.units.origin != origin:
-                        comp_messages.add("\ttime start date inconsistent\n")
-                else:
-                    if origin != time_coord.units.origin:
-                        change_messages.add("New time origin set to "
-                                            "{}\n".format(origin))
-                        unify_time_units(cubes)
-    if comp_messages:
+    time_coords = [time_coord for cube in cubes
+                   for time_coord in cube.coords()
+                   if time_coord.units.is_time_reference()]
+    calendars = set()
+    origin_differs = False
+    for time_coord in time_coords:
+        calendars.add(time_coord.units.calendar)
+        if time_coord.units.calendar != calendar:
+            comp_messages.add("\tcalendar format inconsistent\n")
+        if time_coord.units.origin != origin:
+            comp_messages.add("\ttime start date inconsistent\n")
+            origin_differs = True
+    if comp_only:
         for message in comp_messages:
             logger.info(message)
-    if change_messages:
-        for message in change_messages:
-            logger.info(message)
+        return cubes
+    if origin_differs:
+        # As iris.util.unify_time_units, each calendar takes the units of
+        # its first time coordinate, but every coordinate is converted
+        # exactly once.
+        epochs = {}
+        for time_coord in time_coords:
+            epoch = epochs.setdefault(time_coord.units.calendar,
+                                      time_coord.units.origin)
+            _convert_time_coord(time_coord, cf_units.Unit(
+                epoch, time_coord.units.calendar))
+        change_messages.add("New time origin set to {}\n".format(origin))
+    if len(calendars) > 1:
+        change_messages.add("Time coordinates use {} calendars, each is "
+                            "unified separately\n".format(len(calendars)))
+    for message in change_messages:
+        logger.info(message)
 
     return cubes
 
 
 def equalise_data_type(cubes, data_type='float32'):
     """
-    Casts datatypes in iris numpy array to be of the same datatype.
+    Casts datatypes in iris numpy array to be of the same datatype. Lazy
+    data stays lazy, and is cast chunk by chunk when it is computed.
 
     Args:
         cubes: Cubes to have their datatypes equalised.
 
-        data_type: String specifying datatype, default is float32.
+        data_type: Any numpy dtype, or a string naming one, default is
+        float32.
 
 
     Returns:
         cubes: Cubes with their data types identical.
     """
     logger = log_module()
-    if data_type == 'float32':
-        for cube in cubes:
-            cube.data = np.float32(cube.data)
-    elif data_type == 'float64':
-        for cube in cubes:
-            cube.data = np.float64(cube.data)
-    elif data_type == 'int32':
-        for cube in cubes:
-            cube.data = np.int32(cube.data)
-    elif data_type == 'int64':
-        for cube in cubes:
-            cube.data = np.int64(cube.data)
-    else:
+    try:
+        data_type = np.dtype(data_type)
+    except TypeError:
         logger.error("invalid data type")
+        return cubes
+    for cube in cubes:
+        if cube.dtype != data_type:
+            cube.data = cube.core_data().astype(data_type)
+    return cubes
 
 
 def equalise_dim_coords(cubes, comp_only=False):
@@ -220,28 +384,20 @@ def equalise_aux_coords(cubes, comp_only=False):
     logger = log_module()
     inconsistencies = set({})
     change_messages = set({})
-    cube_combs = list(combinations(cubes, 2))
-    for combs in cube_combs:
-        cube_a_dict = {c.name(): c for c in combs[0].aux_coords}
-        cube_b_dict = {c.name(): c for c in combs[1].aux_coords}
-        cube_a_coords = {c for c in cube_a_dict}
-        cube_b_coords = {c for c in cube_b_dict}
-        for coord in list(cube_a_coords):
-            if coord not in cube_b_coords:
-                if comp_only:
-                    inconsistencies.add(coord)
-                elif coord == 'height':
-                    change_messages.add("Adding {} coords to cube\n".
-                                        format(coord))
-                    combs[1].add_aux_coord(cube_a_dict[coord])
-        for coord in list(cube_b_coords):
-            if coord not in cube_a_coords:
-                if comp_only:
-                    inconsistencies.add(coord)
-                elif coord == 'height':
-                    change_messages.add("Adding {} coords to cube\n".
-                                        format(coord))
-                    combs[0].add_aux_coord(cube_b_dict[coord])
+    names = [{c.name() for c in cube.aux_coords} for cube in cubes]
+    if names:
+        uncommon = set.union(*names) - set.intersection(*names)
+    else:
+        uncommon = set()
+    if comp_only:
+        inconsistencies = uncommon
+    elif 'height' in uncommon:
+        donor = next(coord for cube in cubes for coord in cube.aux_coords
+                     if coord.name() == 'height')
+        for cube, cube_names in zip(cubes, names):
+            if 'height' not in cube_names:
+                change_messages.add("Adding height coords to cube\n")
+                cube.add_aux_coord(donor.copy())
     if inconsistencies:
         inconsistencies = list(inconsistencies)
         log_inconsistent(inconsistencies, 'coords')
@@ -271,9 +427,9 @@ def remove_attributes(cubes):
 
 def equalise_all(cubes):
     """
-    Invokes equalise_aux_coords, equalise_attributes,
-    equalise_dim_coords and equalise_time units all at once.
-    Used before cube_load concatenates the cubes.
+    Makes the changes of equalise_aux_coords, equalise_attributes,
+    equalise_dim_coords and equalise_time units all at once, from a
+    single plan_equalisation() of the cubes.
 
     Args:
         cubes: Cubes to be equalised.
@@ -283,18 +439,15 @@ def equalise_all(cubes):
 
 
     """
-    cubes = equalise_aux_coords(cubes)
-    cubes = equalise_attributes(cubes)
-    cubes = equalise_dim_coords(cubes)
-    cubes = equalise_time_units(cubes)
-    return cubes
+    return plan_equalisation(cubes).apply(cubes)
 
 
 def compare_cubes(cubes):
     """
     Examines coordinates and attributes across iterable of iris cubes
     And calls equalise functions (with comp_only arg set to true) where
-    appropriate.
+    appropriate. Cubes are grouped by metadata fingerprint, so only one
+    representative of each group is compared in full.
 
     Args:
         cubes: An iterable of iris Cubes or CubeList to be compared
@@ -304,42 +457,25 @@ def compare_cubes(cubes):
         A printed string detailing the inconsistencies in the cubes.
     """
     logger = log_module()
-    uneq_aux_coords = False
-    uneq_dim_coords = False
-    uneq_attr = False
-    uneq_time_coords = False
-    uneq_ndim = False
-    cube_combs = list(combinations(cubes, 2))
-    for comb in cube_combs:
-        if (uneq_aux_coords and
-                uneq_attr and
-                uneq_dim_coords and
-                uneq_time_coords and
-                uneq_ndim):
-            break
-
-        if comb[0].aux_coords != comb[1].aux_coords:
-            uneq_aux_coords = True
-
-        if comb[0].dim_coords != comb[1].dim_coords:
-            uneq_dim_coords = True
-
-        if comb[0].attributes != comb[1].attributes:
-            uneq_attr = True
-
-        if comb[0].ndim != comb[1].ndim:
-            uneq_ndim = True
-            break
-
-        if comb[0].coord('time').units != comb[1].coord('time').units:
-            uneq_time_coords = True
-            break
-
+    if len(cubes) < 2:
+        return
+    fingerprints = [_cube_fingerprint(cube) for cube in cubes]
+    uneq_ndim = _differs(cubes, fingerprints, 'ndim',
+                         lambda cube: cube.ndim)
     if uneq_ndim:
         logger.error("Number of dimensions for cubes differ,"
                      " please load cubes of matching ndim")
         raise OSError
 
+    uneq_aux_coords = _differs(cubes, fingerprints, 'aux_coords',
+                               lambda cube: cube.aux_coords)
+    uneq_dim_coords = _differs(cubes, fingerprints, 'dim_coords',
+                               lambda cube: cube.dim_coords)
+    uneq_attr = _differs(cubes, fingerprints, 'attributes',
+                         lambda cube: cube.attributes)
+    uneq_time_coords = _differs(cubes, fingerprints, 'time_units',
+                                lambda cube: cube.coord('time').units)
+
     if uneq_aux_coords:
         logger.info("\ncube aux coordinates differ: \n")
         equalise_aux_coords(cubes, comp_only=True)
@@ -356,33 +492,577 @@ def compare_cubes(cubes):
         equalise_time_units(cubes, comp_only=True)
 
 
-def _examine_dim_bounds(cubes, cube_files):
-    Range = namedtuple('Range', ['start', 'end'])
+_DIM_COORD_FIELDS = ('standard_name', 'long_name', 'var_name', 'attributes')
+
+
+def _dim_coord_metadata(coord):
+    return OrderedDict([('standard_name', coord.standard_name),
+                        ('long_name', coord.long_name),
+                        ('var_name', coord.var_name),
+                        ('attributes', dict(coord.attributes))])
+
+
+def _add_once(messages, message):
+    if message not in messages:
+        messages.append(message)
+
+
+class EqualisationPlan(object):
+    """
+    The changes that equalise a list of cubes for concatenation, as found
+    by plan_equalisation(), along with the inconsistencies that
+    compare_cubes() would report for them.
+
+    Attributes:
+        removed_attributes: the attribute keys to delete from every cube.
+
+        added_coords: a list of (cube index, coord) pairs, each an aux
+        coord to add to the cube at that index. When the plan is applied
+        the coord is copied from the first cube holding one of the same
+        name, so a reused plan adds the values of the cubes it equalises;
+        the stored coord is only used if none of them has one.
+
+        renamed_coords: a list of (cube index, coord name, changes)
+        triples, where changes maps the names of the coord's
+        standard_name, long_name, var_name and attributes to their new
+        values.
+
+        time_epochs: a dict mapping each calendar to the time origin its
+        time coords are converted to, or None if time units are left as
+        they are.
+    """
+    def __init__(self, removed_attributes, added_coords, renamed_coords,
+                 time_epochs, differing=(), uncommon_coords=(),
+                 dim_inconsistencies=None, time_inconsistencies=(),
+                 time_changes=(), fingerprint=None):
+        self.removed_attributes = list(removed_attributes)
+        self.added_coords = list(added_coords)
+        self.renamed_coords = list(renamed_coords)
+        self.time_epochs = time_epochs
+        self._differing = set(differing)
+        self._uncommon_coords = list(uncommon_coords)
+        self._dim_inconsistencies = dim_inconsistencies or {}
+        self._time_inconsistencies = list(time_inconsistencies)
+        self._time_changes = list(time_changes)
+        self.fingerprint = fingerprint
+
+    def matches(self, cubes):
+        """
+        Checks cheaply whether the plan can equalise cubes other than
+        those it was made for, such as another member of an ensemble
+        sharing their file layout.
+
+        Args:
+            cubes: the CubeList or list of Cubes to check.
+
+        Returns:
+            True if cubes have the same layout fingerprint as the cubes
+            the plan was made for, and the same uncommon attributes.
+        """
+        if self.fingerprint is None or \
+                _layout_fingerprint(cubes) != self.fingerprint:
+            return False
+        return _uncommon_attributes(cubes) == set(self.removed_attributes)
+
+    def compare(self):
+        """
+        Logs the inconsistencies between the planned cubes, as
+        compare_cubes() does.
+
+        Raises:
+            OSError: if the cubes differ in their number of dimensions.
+        """
+        logger = log_module()
+        if 'ndim' in self._differing:
+            logger.error("Number of dimensions for cubes differ,"
+                         " please load cubes of matching ndim")
+            raise OSError
+        if 'aux_coords' in self._differing:
+            logger.info("\ncube aux coordinates differ: \n")
+            log_inconsistent(self._uncommon_coords, 'coords')
+        if 'dim_coords' in self._differing and \
+                any(self._dim_inconsistencies.values()):
+            logger.info("\ncube dim coordinates differ: \n")
+            for field in _DIM_COORD_FIELDS:
+                log_inconsistent(self._dim_inconsistencies.get(field, []),
+                                 'coords ' + field)
+        if 'attributes' in self._differing:
+            logger.info("cube attributes differ: \n")
+            log_inconsistent(self.removed_attributes, 'attributes')
+        if 'time_units' in self._differing:
+            logger.info("cube time coordinates differ: \n")
+            for message in self._time_inconsistencies:
+                logger.info(message)
+
+    def apply(self, cubes):
+        """
+        Equalises cubes in a single pass, logging the changes made as
+        equalise_all() does.
+
+        Args:
+            cubes: the CubeList or list of Cubes the plan was made for.
+
+        Returns:
+            cubes, equalised across metadata and coords.
+        """
+        logger = log_module()
+        donors = {}
+        for cube in cubes:
+            for coord in cube.aux_coords:
+                donors.setdefault(coord.name(), coord)
+        added = {}
+        for index, coord in self.added_coords:
+            added.setdefault(index, []).append(
+                donors.get(coord.name(), coord))
+        renamed = {}
+        for index, name, changes in self.renamed_coords:
+            renamed.setdefault(index, []).append((name, changes))
+        for index, cube in enumerate(cubes):
+            for key in self.removed_attributes:
+                try:
+                    del cube.attributes[key]
+                except KeyError:
+                    pass
+            for coord in added.get(index, []):
+                cube.add_aux_coord(coord.copy())
+            for name, changes in renamed.get(index, []):
+                coord = cube.coord(name)
+                try:
+                    for field, value in changes.items():
+                        setattr(coord, field, value)
+                except ValueError:
+                    pass
+            if self.time_epochs is not None:
+                for coord in cube.coords():
+                    if coord.units.is_time_reference():
+                        calendar = coord.units.calendar
+                        _convert_time_coord(coord, cf_units.Unit(
+                            self.time_epochs[calendar], calendar))
+        added_names = []
+        for _, coord in self.added_coords:
+            _add_once(added_names, coord.name())
+        for name in added_names:
+            logger.info("Adding {} coords to cube\n".format(name))
+        log_coord_remove(self.removed_attributes, 'attributes')
+        for message in self._time_changes:
+            logger.info(message)
+        return cubes
+
+
+def plan_equalisation(cubes):
+    """
+    Works out how to equalise cubes for concatenation, gathering all of
+    the metadata that compare_cubes() and equalise_all() examine in a
+    single traversal of the cubes.
+
+    Args:
+        cubes: CubeList or list of Cubes to plan the equalisation of.
+
+    Returns:
+        An EqualisationPlan of what will be removed, added and renamed.
+        Its compare() logs the inconsistencies between the cubes and its
+        apply() equalises them in one pass.
+    """
+    fingerprints = []
+    attribute_counts = Counter()
+    aux_names = []
+    donors = {}
+    dim_targets = OrderedDict()
+    named_coords = []
+    time_units = []
+    for cube in cubes:
+        fingerprints.append(_cube_fingerprint(cube))
+        attribute_counts.update((key, _attribute_token(value))
+                                for key, value in cube.attributes.items())
+        names = set()
+        for coord in cube.aux_coords:
+            names.add(coord.name())
+            donors.setdefault(coord.name(), coord)
+        aux_names.append(names)
+        for coord in cube.dim_coords:
+            dim_targets[coord.name()] = _dim_coord_metadata(coord)
+        coords = {}
+        for coord in cube.coords():
+            coords.setdefault(coord.name(), coord)
+            if coord.units.is_time_reference():
+                time_units.append(coord.units)
+        named_coords.append(coords)
+    n_cubes = len(fingerprints)
+
+    removed_attributes = sorted({key for (key, _), count
+                                 in attribute_counts.items()
+                                 if count != n_cubes})
+    if aux_names:
+        uncommon_coords = set.union(*aux_names) - set.intersection(*aux_names)
+    else:
+        uncommon_coords = set()
+    added_coords = []
+    if 'height' in uncommon_coords:
+        added_coords = [(index, donors['height'])
+                        for index, names in enumerate(aux_names)
+                        if 'height' not in names]
+
+    renamed_coords = []
+    dim_inconsistencies = OrderedDict((field, set())
+                                      for field in _DIM_COORD_FIELDS)
+    for index, coords in enumerate(named_coords):
+        for name, target in dim_targets.items():
+            coord = coords.get(name)
+            if coord is None:
+                continue
+            current = _dim_coord_metadata(coord)
+            changes = OrderedDict()
+            for field, value in target.items():
+                if field == 'attributes':
+                    differs = _attributes_token(current[field]) != \
+                        _attributes_token(value)
+                else:
+                    differs = current[field] != value
+                if differs:
+                    changes[field] = value
+                    dim_inconsistencies[field].add(name)
+            if changes:
+                renamed_coords.append((index, name, changes))
+
+    time_epochs = None
+    time_inconsistencies = []
+    time_changes = []
+    if n_cubes:
+        reference = cubes[0].coord('time').units
+        epochs = OrderedDict()
+        for units in time_units:
+            epochs.setdefault(units.calendar, units.origin)
+            if units.calendar != reference.calendar:
+                _add_once(time_inconsistencies,
+                          "\tcalendar format inconsistent\n")
+            if units.origin != reference.origin:
+                _add_once(time_inconsistencies,
+                          "\ttime start date inconsistent\n")
+                time_epochs = epochs
+        if time_epochs is not None:
+            time_changes.append(
+                "New time origin set to {}\n".format(reference.origin))
+        if len(epochs) > 1:
+            time_changes.append("Time coordinates use {} calendars, each "
+                                "is unified separately\n"
+                                .format(len(epochs)))
+
+    differing = set()
+    if n_cubes > 1:
+        getters = {'ndim': lambda cube: cube.ndim,
+                   'aux_coords': lambda cube: cube.aux_coords,
+                   'dim_coords': lambda cube: cube.dim_coords,
+                   'attributes': lambda cube: cube.attributes,
+                   'time_units': lambda cube: cube.coord('time').units}
+        differing = {field for field, getter in getters.items()
+                     if _differs(cubes, fingerprints, field, getter)}
+
+    return EqualisationPlan(
+        removed_attributes, added_coords, renamed_coords, time_epochs,
+        differing=differing, uncommon_coords=sorted(uncommon_coords),
+        dim_inconsistencies=OrderedDict(
+            (field, sorted(names))
+            for field, names in dim_inconsistencies.items()),
+        time_inconsistencies=time_inconsistencies,
+        time_changes=time_changes,
+        fingerprint=_layout_fingerprint(cubes))
+
+
+def _json_default(value):
+    # Numpy scalars keep their dtype, as attribute values are compared
+    # by type as well as value when cubes are concatenated.
+    if isinstance(value, (np.ndarray, np.generic)):
+        return {'__ndarray__': value.tolist(), 'dtype': value.dtype.str}
+    raise TypeError("{!r} cannot be saved as JSON".format(value))
+
+
+def _json_object(contents):
+    if '__ndarray__' in contents:
+        value = np.array(contents['__ndarray__'], dtype=contents['dtype'])
+        return value[()] if value.ndim == 0 else value
+    return contents
+
+
+def _coord_contents(coord):
+    return {'standard_name': coord.standard_name,
+            'long_name': coord.long_name,
+            'var_name': coord.var_name,
+            'units': str(coord.units),
+            'calendar': coord.units.calendar,
+            'points': coord.points,
+            'bounds': coord.bounds,
+            'attributes': dict(coord.attributes)}
+
+
+def _coord_from_contents(contents):
+    return iris.coords.AuxCoord(
+        contents['points'],
+        standard_name=contents['standard_name'],
+        long_name=contents['long_name'],
+        var_name=contents['var_name'],
+        units=cf_units.Unit(contents['units'], contents['calendar']),
+        bounds=contents['bounds'],
+        attributes=contents['attributes'])
+
+
+def save_plan(plan, filename):
+    """
+    Saves an EqualisationPlan as JSON, so that it can be reapplied to
+    other cubes sharing the layout of those it was made for.
+
+    Args:
+        plan: the EqualisationPlan to save.
+
+        filename: the JSON file to write.
+
+    Returns:
+        filename.
+    """
+    contents = {'version': PLAN_VERSION,
+                'fingerprint': plan.fingerprint,
+                'removed_attributes': plan.removed_attributes,
+                'added_coords': [[index, _coord_contents(coord)]
+                                 for index, coord in plan.added_coords],
+                'renamed_coords': plan.renamed_coords,
+                'time_epochs': plan.time_epochs,
+                'differing': sorted(plan._differing),
+                'uncommon_coords': plan._uncommon_coords,
+                'dim_inconsistencies': plan._dim_inconsistencies,
+                'time_inconsistencies': plan._time_inconsistencies,
+                'time_changes': plan._time_changes}
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as fh:
+        json.dump(contents, fh, default=_json_default)
+    os.replace(tmp_filename, filename)
+    return filename
+
+
+def load_plan(filename):
+    """
+    Loads an EqualisationPlan saved by save_plan().
+
+    Args:
+        filename: a JSON file written by save_plan().
+
+    Returns:
+        the EqualisationPlan. Check it with its matches() method before
+        applying it to cubes other than those it was made for.
+    """
+    with open(filename) as fh:
+        contents = json.load(fh, object_hook=_json_object)
+    if contents.get('version') != PLAN_VERSION:
+        raise ValueError("Unsupported plan file version "
+                         "{}".format(contents.get('version')))
+    return EqualisationPlan(
+        contents['removed_attributes'],
+        [(index, _coord_from_contents(coord))
+         for index, coord in contents['added_coords']],
+        [(index, name, OrderedDict(
+            (field, changes[field]) for field in _DIM_COORD_FIELDS
+            if field in changes))
+         for index, name, changes in contents['renamed_coords']],
+        contents['time_epochs'],
+        differing=contents['differing'],
+        uncommon_coords=contents['uncommon_coords'],
+        dim_inconsistencies=contents['dim_inconsistencies'],
+        time_inconsistencies=contents['time_inconsistencies'],
+        time_changes=contents['time_changes'],
+        fingerprint=contents['fingerprint'])
+
+
+def equalise_to_cube(target, cubes):
+    """
+    Equalises cubes against the metadata of a single target cube, such as
+    one already equalised and concatenated by cube_help.load(), so that
+    they can be concatenated onto it. Only the target's own metadata is
+    examined, so the cost grows with the cubes given rather than with the
+    length of the target.
+
+    Attributes not common to the target and all of the cubes are removed
+    from each of them, and a height coord is added wherever one is
+    missing. The cubes take the names and attributes of the target's dim
+    coords, the time origin and time coord dtypes of the target, and the
+    target's data type. The target and the cubes are modified in place;
+    pass a copy of the target to keep the original.
+
+    Args:
+        target: the Cube to equalise against.
+
+        cubes: CubeList or list of Cubes to equalise.
+
+    Returns:
+        cubes, equalised against target.
+    """
+    logger = log_module()
+    change_messages = []
+    every_cube = [target] + list(cubes)
+    uncommon_keys = sorted(_uncommon_attributes(every_cube))
+    donor = None
+    for cube in every_cube:
+        for key in uncommon_keys:
+            try:
+                del cube.attributes[key]
+            except KeyError:
+                pass
+        if donor is None:
+            donor = next((coord for coord in cube.aux_coords
+                          if coord.name() == 'height'), None)
+    if donor is not None:
+        for cube in every_cube:
+            if 'height' not in {coord.name() for coord in cube.aux_coords}:
+                _add_once(change_messages, "Adding height coords to cube\n")
+                cube.add_aux_coord(donor.copy())
+
+    dim_targets = {coord.name(): _dim_coord_metadata(coord)
+                   for coord in target.dim_coords}
+    origin = target.coord('time').units.origin
+    time_coords = {coord.name(): coord for coord in target.coords()
+                   if coord.units.is_time_reference()}
+    for cube in cubes:
+        for coord in cube.dim_coords:
+            metadata = dim_targets.get(coord.name())
+            if metadata is None:
+                continue
+            try:
+                for field, value in metadata.items():
+                    setattr(coord, field, value)
+            except ValueError:
+                pass
+        for coord in cube.coords():
+            if not coord.units.is_time_reference():
+                continue
+            units = cf_units.Unit(origin, coord.units.calendar)
+            if coord.units != units:
+                _convert_time_coord(coord, units)
+                _add_once(change_messages,
+                          "New time origin set to {}\n".format(origin))
+            time_coord = time_coords.get(coord.name())
+            if time_coord is not None and coord.dtype != time_coord.dtype:
+                coord.points = coord.core_points().astype(time_coord.dtype)
+                if coord.has_bounds():
+                    coord.bounds = \
+                        coord.core_bounds().astype(time_coord.dtype)
+    equalise_data_type(cubes, target.dtype)
+    log_coord_remove(uncommon_keys, 'attributes')
+    for message in change_messages:
+        logger.info(message)
+    return cubes
+
+
+DimBoundsReport = namedtuple('DimBoundsReport', ['overlaps', 'duplicates',
+                                                 'gaps', 'message'])
+
+
+def _time_extents(cubes):
+    """
+    Collects the first and last time of each cube into numpy arrays, in
+    the time units of the first cube. Bounds are used when every cube has
+    them, otherwise points.
+
+    Returns:
+        starts, ends, bounded and step, where step is the typical spacing
+        between points (None if it cannot be told or bounds are used).
+    """
+    time_coords = [cube.coord('time') for cube in cubes]
+    units = time_coords[0].units
+    bounded = all(coord.has_bounds() for coord in time_coords)
+    starts = np.empty(len(cubes))
+    ends = np.empty(len(cubes))
+    steps = []
+    for i, coord in enumerate(time_coords):
+        values = coord.bounds if bounded else coord.points
+        extent = np.array([np.min(values), np.max(values)], dtype='float64')
+        if coord.units != units:
+            try:
+                extent = coord.units.convert(extent, units)
+            except ValueError:
+                # Differing calendars, compare the values as they are.
+                pass
+        starts[i], ends[i] = extent
+        if not bounded and coord.shape[0] > 1:
+            steps.append((extent[1] - extent[0]) / (coord.shape[0] - 1))
+    step = float(np.median(steps)) if steps else None
+    return starts, ends, bounded, step
+
+
+def _same_time(time_a, time_b):
+    """
+    Returns True if two times are equal, allowing only for float error
+    rather than a tolerance relative to the size of the epoch offset.
+    """
+    return np.isclose(time_a, time_b, rtol=0)
+
+
+def _dim_bounds_report(cubes, cube_files):
+    """
+    Finds every overlap, duplicate and gap between the time spans of
+    cubes with a single sweep over the spans sorted by start and end
+    time, keeping a heap of the spans still open at each start.
+    """
+    overlaps = []
+    duplicates = []
+    gaps = []
     msg = ''
-    for i, cube_a in enumerate(cubes):
-        for j, cube_b in enumerate(cubes):
-            if i != j:
-                range_a = Range(start=cube_a.coord('time').bounds[0][0],
-                                end=cube_a.coord('time').bounds[-1][-1])
-                range_b = Range(start=cube_b.coord('time').bounds[0][0],
-                                end=cube_b.coord('time').bounds[-1][-1])
-                latest_start = max(range_a.start, range_b.start)
-                earliest_end = min(range_a.end, range_b.end)
-                delta = earliest_end - latest_start
-                overlap = max(0, delta)
-                if overlap > 0:
-                    msg = msg + "\nThe time coordinates overlap at cube {}" \
-                                " and cube {}".format(i, j)
-                    msg = msg + "\nThese cubes are: \n\t{}\n\t{}"\
-                        .format(cube_files[i], cube_files[j])
-                    break
-    return msg
+    if not len(cubes):
+        return DimBoundsReport(overlaps, duplicates, gaps, msg)
+    starts, ends, bounded, step = _time_extents(cubes)
+
+    def closed(index, start):
+        # Bounded spans may touch end to start, time points may not.
+        if _same_time(ends[index], start):
+            return bounded
+        return ends[index] < start
+
+    def report(pairs, pair, message):
+        pairs.append(pair)
+        return message.format(*pair) + "\nThese cubes are: \n\t{}\n\t{}"\
+            .format(cube_files[pair[0]], cube_files[pair[1]])
+
+    active = []
+    furthest = None
+    for current in np.lexsort((ends, starts)):
+        current = int(current)
+        start = starts[current]
+        while active and closed(active[0][1], start):
+            heapq.heappop(active)
+        if not active and furthest is not None:
+            gap = start - ends[furthest]
+            if (bounded and gap > 0 and not _same_time(gap, 0)) or \
+                    (step is not None and gap > 1.5 * step):
+                msg = msg + report(
+                    gaps, (min(furthest, current), max(furthest, current)),
+                    "\nThere is a gap in the time coordinates between "
+                    "cube {} and cube {}")
+        for _, other in sorted(active, key=lambda item: item[1]):
+            pair = (min(other, current), max(other, current))
+            if _same_time(starts[other], start) and \
+                    _same_time(ends[other], ends[current]):
+                msg = msg + report(
+                    duplicates, pair,
+                    "\nThe time coordinates are duplicated at cube {}"
+                    " and cube {}")
+            else:
+                msg = msg + report(
+                    overlaps, pair,
+                    "\nThe time coordinates overlap at cube {}"
+                    " and cube {}")
+        heapq.heappush(active, (ends[current], current))
+        if furthest is None or ends[current] > ends[furthest]:
+            furthest = current
+    return DimBoundsReport(sorted(overlaps), sorted(duplicates),
+                           sorted(gaps), msg)
+
+
+def _examine_dim_bounds(cubes, cube_files):
+    return _dim_bounds_report(cubes, cube_files).message
 
 
 def examine_dim_bounds(cubes, cube_files):
     """
     Examines the dimensional bounds of time should concatenate fail.
-    Cycles through cubes and determines if the times are contiguous.
+    Sorts the cubes by start time and sweeps through them once to find
+    where the times overlap, are duplicated or leave a gap. Time points
+    are used for cubes without time bounds.
 
     Args:
          cubes: Iris cubes to examine the time bounds of
@@ -391,8 +1071,11 @@ def examine_dim_bounds(cubes, cube_files):
          info as to what cubes are causing problems with concatenation.
 
     Returns:
-        A printed string detailing any overlap in the time bounds.
+        A DimBoundsReport, holding lists of the (i, j) index pairs of
+        cubes that overlap, are duplicated and leave a gap, and the
+        printed message detailing them.
     """
     logger = log_module()
-    msg = _examine_dim_bounds(cubes, cube_files)
-    logger.info(msg)
+    report = _dim_bounds_report(cubes, cube_files)
+    logger.info(report.message)
+    return report
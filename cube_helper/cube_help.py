@@ -5,6 +5,9 @@
 # BSD 3-Clause license.
 # See LICENSE in the root of the repository for full licensing details.
 from __future__ import (absolute_import, division, print_function)
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import os
 import iris
 import iris.analysis
 import iris.coord_categorisation
@@ -14,14 +17,32 @@ from six import string_types
 from cube_helper.logger import log_module
 from cube_helper.cube_loader import (load_from_filelist,
                                      load_from_dir,
+                                     iter_files,
+                                     _constrain_paths,
                                      _constraint_compatible,
-                                     _fix_partial_datetime)
-from cube_helper.cube_equaliser import (compare_cubes,
-                                        equalise_all,
+                                     _fix_partial_datetime,
+                                     _check_sort,
+                                     _load_path,
+                                     _map_paths,
+                                     _normalise_constraint,
+                                     _order_loaded,
+                                     _route_path)
+from cube_helper.cube_equaliser import (equalise_all,
+                                        equalise_to_cube,
+                                        load_plan,
+                                        plan_equalisation,
+                                        save_plan,
                                         _examine_dim_bounds)
+from cube_helper.fix_known import fix_known_issues
+from cube_helper.reference import (extend_reference,
+                                   _read_reference,
+                                   _rebuild_reference)
 
 
-def load(directory, filetype='.nc', constraints=None):
+def load(directory, filetype='.nc', constraints=None, workers=None,
+         executor='thread', catalog=None, filename_dates=None,
+         sort='origin', recursive=False, include=None, exclude=None,
+         max_depth=None, cache=None, plan=None):
     """
     A function that loads and concatenates Iris Cubes.
 
@@ -34,46 +55,298 @@ def load(directory, filetype='.nc', constraints=None):
 
         constraints: Any constraints to be applied to Cubes on load.
 
+        workers: The number of files to load concurrently. None (the
+        default) loads the files one after another.
+
+        executor: The pool used when workers is set, either 'thread'
+        (the default) or 'process'.
+
+        catalog: True, or a cube_helper.catalog.Catalog, to keep an on-disk
+        metadata index of the directory. Ignored for lists of files.
+
+        filename_dates: True, or a file name date pattern, to sort and
+        prune files by the time range in their names (e.g. CMIP/DRS
+        names ending ``_185001-194912.nc``) instead of opening them.
+
+        sort: 'origin' (the default) orders the cubes by the origin of their
+        time units before concatenation, 'time' by their first time point.
+
+        recursive: If True, also load files from nested subdirectories of
+        directory. include, exclude and max_depth limit the search as
+        described in cube_loader.iter_files(). Ignored for lists of files.
+
+        cache: A cube_helper.result_cache.ResultCache. If the same files,
+        unchanged, have been loaded with the same constraints and filetype
+        before, the cached cube is returned with its data opened lazily
+        and no loading, equalisation or concatenation is repeated.
+
+        plan: A cube_helper.cube_equaliser.EqualisationPlan, or the name
+        of a JSON plan file, to equalise the cubes with instead of working
+        out their changes again. It is only applied if its fingerprint
+        matches the loaded cubes, otherwise they are equalised in full.
+        The differences recorded in a reused plan are those of the cubes
+        it was made for, so they are not reported again.
+        A plan file that does not exist yet is written with the plan of
+        this load, so that loads of further ensemble members reuse it.
+
     Returns:
         result: A concatenated Iris Cube.
     """
-    logger = log_module()
+    cache_key = None
+    if cache is not None:
+        if isinstance(directory, string_types):
+            paths = iter_files(directory, filetype, recursive, include,
+                               exclude, max_depth)
+        else:
+            paths = [path for path in directory if path.endswith(filetype)]
+        cache_key = cache.key(paths, constraints, filetype)
+        result = cache.get(cache_key)
+        if result is not None:
+            return result
     if isinstance(directory, string_types):
         loaded_cubes, cube_files = load_from_dir(
-            directory, filetype, constraints)
-        if not loaded_cubes:
-            raise OSError("No cubes loaded")
-        else:
-            compare_cubes(loaded_cubes)
-            result = equalise_all(loaded_cubes)
-            result = iris.cube.CubeList(result)
-            try:
-                result = result.concatenate_cube()
-                return result
-            except iris.exceptions.ConcatenateError:
-                logger.info("\nThere was an error in concatenation\n")
-                err_msg = _examine_dim_bounds(result, cube_files)
-                logger.error(err_msg)
-                raise
-
+            directory, filetype, constraints, workers, executor, catalog,
+            filename_dates, sort, recursive, include, exclude, max_depth)
     elif isinstance(directory, list):
         loaded_cubes, cube_files = load_from_filelist(
-            directory, filetype, constraints)
+            directory, filetype, constraints, workers, executor,
+            filename_dates, sort)
+    else:
+        return None
+    result = _equalise_and_concatenate(loaded_cubes, cube_files, plan)
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+def _reusable_plan(loaded_cubes, plan):
+    """
+    Returns plan if it can equalise loaded_cubes, or else a new
+    EqualisationPlan of them, and whether plan was reused. plan may be a
+    plan file name, which is written with the new plan if it does not
+    exist.
+    """
+    filename = None
+    if isinstance(plan, string_types):
+        filename = plan
+        plan = load_plan(filename) if os.path.exists(filename) else None
+    if plan is not None and plan.matches(loaded_cubes):
+        return plan, True
+    plan = plan_equalisation(loaded_cubes)
+    if filename is not None and not os.path.exists(filename):
+        save_plan(plan, filename)
+    return plan, False
+
+
+def _equalise_and_concatenate(loaded_cubes, cube_files, plan=None):
+    """
+    Compares, equalises and concatenates the cubes found by load().
 
+    Args:
+        loaded_cubes: the loaded Cubes, sorted by date.
+
+        cube_files: the respective files of loaded_cubes.
+
+        plan (optional): an EqualisationPlan or plan file name to reuse,
+        as described in load().
+
+    Returns:
+        result: A concatenated Iris Cube.
+    """
+    logger = log_module()
+    if not loaded_cubes:
+        raise OSError("No cubes loaded")
+    plan, reused = _reusable_plan(loaded_cubes, plan)
+    if not reused:
+        # A reused plan holds the comparison of other cubes.
+        plan.compare()
+    result = plan.apply(loaded_cubes)
+    result = iris.cube.CubeList(result)
+    try:
+        result = result.concatenate_cube()
+        return result
+    except iris.exceptions.ConcatenateError:
+        logger.info("\nThere was an error in concatenation\n")
+        err_msg = _examine_dim_bounds(result, cube_files)
+        logger.error(err_msg)
+        raise
+
+
+def load_incremental(existing, new_files, filetype='.nc', constraints=None,
+                     workers=None, executor='thread', sort='origin'):
+    """
+    Extends an already equalised and concatenated cube along time with
+    the cubes from some new files. Only the new cubes are loaded, and
+    they are equalised against the metadata of the existing cube, so the
+    cost grows with the new data rather than with the whole archive.
+
+    Args:
+        existing: the Cube returned by an earlier load() or
+        load_incremental(), or the name of a reference file written for
+        it by save_reference(). A reference file is updated to describe
+        the extended cube, and files it already refers to are skipped, so
+        new_files may be the whole archive directory.
+
+        new_files: A String specifying a directory, or a list of
+        filenames, holding the new data. It must follow the existing
+        times.
+
+        filetype, constraints, workers, executor and sort are as for
+        load(), and apply to the new files only.
+
+    Returns:
+        result: the extended, concatenated Iris Cube. An existing Cube
+        passed in is not modified.
+    """
+    logger = log_module()
+    reference_file = None
+    known_files = set()
+    if isinstance(existing, string_types):
+        reference_file = existing
+        contents = _read_reference(reference_file)
+        known_files = {segment['path'] for segment in contents['segments']}
+        existing = _rebuild_reference(contents)
+    if isinstance(new_files, string_types):
+        new_files = iter_files(new_files, filetype)
+    new_files = [path for path in new_files
+                 if os.path.abspath(path) not in known_files]
+    if not new_files:
+        return existing
+    loaded_cubes, cube_files = load_from_filelist(
+        new_files, filetype, constraints, workers, executor, sort=sort)
+    if not loaded_cubes:
+        return existing
+    if reference_file is None:
+        # The caller's cube is left untouched, even if the concatenation
+        # fails; copying keeps lazy data lazy.
+        existing = existing.copy()
+    equalise_to_cube(existing, loaded_cubes)
+    cubes = iris.cube.CubeList([existing] + list(loaded_cubes))
+    try:
+        result = cubes.concatenate_cube()
+    except iris.exceptions.ConcatenateError:
+        logger.info("\nThere was an error in concatenation\n")
+        err_msg = _examine_dim_bounds(cubes, ['existing cube'] + cube_files)
+        logger.error(err_msg)
+        raise
+    if reference_file is not None:
+        extend_reference(reference_file, result, cube_files)
+    return result
+
+
+def load_many(directory, constraints, filetype='.nc', workers=None,
+              executor='thread', sort='origin', recursive=False,
+              include=None, exclude=None, max_depth=None):
+    """
+    Loads and concatenates several variables from the same set of files
+    in one pass. Each file is opened once and its cubes are routed to
+    every request whose constraint they match, then each variable is
+    compared, equalised and concatenated independently.
+
+    Args:
+        directory: A String specifying the directory of the Cubes you wish
+        to load, or a list of filenames.
+
+        constraints: A dict mapping a name for each request to the
+        constraint (an iris.Constraint or a variable name) that selects
+        its cubes, e.g. {'tas': 'air_temperature', 'pr': pr_constraint}.
+
+        filetype: Extension of Iris Cubes to Load. set to '.nc' by default.
+
+        workers: The number of files to read concurrently, and of
+        variables to equalise and concatenate concurrently. None (the
+        default) does everything one at a time.
+
+        executor: The pool used to read files when workers is set, either
+        'thread' (the default) or 'process'.
+
+        sort, recursive, include, exclude and max_depth are as for load().
+
+    Returns:
+        results: A dict mapping each request name to its concatenated
+        Iris Cube.
+    """
+    _check_sort(sort)
+    if isinstance(directory, string_types):
+        paths = list(iter_files(directory, filetype, recursive, include,
+                                exclude, max_depth))
+    else:
+        paths = [path for path in directory if path.endswith(filetype)]
+    if not paths:
+        raise OSError("No cubes loaded")
+    constraints = {name: (constraint if constraint is None else
+                          _normalise_constraint(constraint, paths[0]))
+                   for name, constraint in constraints.items()}
+    per_request = {name: [] for name in constraints}
+    results = _map_paths(partial(_route_path, constraints=constraints),
+                         paths, workers, executor)
+    for path, routed in results:
+        for name, cubes in routed.items():
+            per_request[name].append((path, cubes))
+    loaded = {}
+    for name, request_results in per_request.items():
+        loaded_cubes, cube_files = _order_loaded(request_results, sort)
         if not loaded_cubes:
-            raise OSError("No cubes loaded")
-        else:
-            compare_cubes(loaded_cubes)
-            result = equalise_all(loaded_cubes)
-            result = iris.cube.CubeList(result)
-            try:
-                result = result.concatenate_cube()
-                return result
-            except iris.exceptions.ConcatenateError:
-                logger.info("\nThere was an error in concatenation\n")
-                err_msg = _examine_dim_bounds(result, cube_files)
-                logger.error(err_msg)
-                raise
+            raise OSError("No cubes loaded for '{}'".format(name))
+        loaded[name] = (loaded_cubes, cube_files)
+
+    def concatenate_request(name):
+        return name, _equalise_and_concatenate(*loaded[name])
+
+    if workers and workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(pool.map(concatenate_request, loaded))
+    return dict(concatenate_request(name) for name in loaded)
+
+
+def iter_load(directory, filetype='.nc', constraints=None, fix_known=False,
+              workers=None, executor='thread', recursive=False, include=None,
+              exclude=None, max_depth=None):
+    """
+    A generator that loads Iris Cubes one file at a time, yielding each
+    cube as soon as its file has been read. Unlike load() the cubes are
+    neither equalised nor concatenated, so per-file processing can start
+    straight away and only the cubes in flight are held in memory.
+
+    Args:
+        directory: A String specifying the directory of the Cubes you wish
+        to load, or a list of filenames.
+
+        filetype: Extension of Iris Cubes to Load. set to '.nc' by default.
+
+        constraints: Any constraints to be applied to each Cube on load.
+        Files whose time range cannot match the constraint are skipped.
+
+        fix_known: If True, apply fix_known_issues() to each Cube before it
+        is yielded.
+
+        workers: The number of files to read ahead concurrently. None (the
+        default) reads one file at a time.
+
+        executor: The pool used when workers is set, either 'thread'
+        (the default) or 'process'.
+
+        recursive: If True, also load files from nested subdirectories of
+        directory. include, exclude and max_depth limit the search as
+        described in cube_loader.iter_files(). Ignored for lists of files.
+
+    Yields:
+        (path, cube) pairs, in the order the files were found rather than
+        sorted by date.
+    """
+    if isinstance(directory, string_types):
+        paths = iter_files(directory, filetype, recursive, include,
+                           exclude, max_depth)
+    else:
+        paths = (path for path in directory if path.endswith(filetype))
+    paths, constraints = _constrain_paths(paths, constraints)
+    results = _map_paths(partial(_load_path, constraint=constraints),
+                         paths, workers, executor)
+    for path, cubes in results:
+        for cube in cubes:
+            if fix_known:
+                fix_known_issues(cube)
+            yield path, cube
 
 
 def _season_year(**kwargs):
@@ -5,15 +5,109 @@
 # See LICENSE in the root of the repository for full licensing details.
 
 import os
-import glob
+import contextlib
+import itertools
+import multiprocessing
+import re
+import sys
+import threading
+import weakref
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
+from fnmatch import fnmatch
+from functools import lru_cache, partial
+import operator
 
 import iris
+import iris._constraints
+import iris.coords
 import iris.cube
 from iris.exceptions import MergeError, ConstraintMismatchError
 import iris.time
+import cf_units
+import cftime
+import dask
+import dask.array as da
+import netCDF4
+import numpy as np
 from six import string_types
 
+from cube_helper.catalog import Catalog, _date_key
+
+
+class _ReentrantLock(object):
+    """
+    Lets the thread holding a plain threading.Lock acquire it again.
+    """
+    def __init__(self, lock):
+        self._lock = lock
+        self._owner = None
+        self._count = 0
+
+    def acquire(self, blocking=True):
+        thread = threading.current_thread()
+        if self._owner is thread:
+            self._count += 1
+            return True
+        if not self._lock.acquire(blocking):
+            return False
+        self._owner = thread
+        self._count = 1
+        return True
+
+    def release(self):
+        self._count -= 1
+        if not self._count:
+            self._owner = None
+            self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *args):
+        self.release()
+
+
+# The netCDF-C library is not thread-safe, so every netCDF4 call made by
+# cube_helper holds one lock. iris >= 3.6 takes its own lock around its
+# netCDF4 calls, which is shared; older versions of iris take none, and
+# their loads are made while holding ours instead.
+try:
+    from iris.fileformats.netcdf._thread_safe_nc import \
+        _GLOBAL_NETCDF4_LOCK
+    _NETCDF_LOCK = _ReentrantLock(_GLOBAL_NETCDF4_LOCK)
+    _IRIS_NETCDF_LOCKED = True
+except ImportError:
+    _NETCDF_LOCK = threading.RLock()
+    _IRIS_NETCDF_LOCKED = False
+
+
+def _load_raw(path, constraint=None):
+    """
+    Calls iris.load_raw, holding the netCDF lock unless iris takes it
+    itself, so that files can be loaded safely from several threads.
+    """
+    if _IRIS_NETCDF_LOCKED:
+        return iris.load_raw(path, constraint)
+    with _NETCDF_LOCK:
+        return iris.load_raw(path, constraint)
+
+
+def _process_pool(max_workers):
+    # Forked children can inherit HDF5/netCDF locks held by other
+    # threads and deadlock, so worker processes are spawned where the
+    # Python version (3.7 and later) lets the pool choose.
+    if sys.version_info < (3, 7):
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'))
+
+
+_EXECUTORS = {'thread': ThreadPoolExecutor,
+              'process': _process_pool}
+
 
 def _check_pdt_year(cell, partial_datetime):
     if partial_datetime.year:
@@ -64,11 +158,22 @@ def _check_pdt_microsecond(cell, partial_datetime):
         return cell.point.microsecond
 
 
-def _fix_partial_datetime(constraint):
-    if isinstance(constraint._coord_values['time'], iris.time.PartialDateTime):
-        part_datetime = constraint._coord_values['time']
-        new_constraint = iris.Constraint(
-            time=lambda cell:
+class _PartialDateTimeMatch(object):
+    """
+    Callable used in place of a lambda by _fix_partial_datetime() so
+    that the fixed constraint can be pickled and sent to worker
+    processes.
+
+    Args:
+        partial_datetime: the iris.time.PartialDateTime to match
+        cell points against.
+    """
+    def __init__(self, partial_datetime):
+        self.partial_datetime = partial_datetime
+
+    def __call__(self, cell):
+        part_datetime = self.partial_datetime
+        return (
             cell.point.year == _check_pdt_year(cell, part_datetime) and
             cell.point.month == _check_pdt_month(cell, part_datetime) and
             cell.point.day == _check_pdt_day(cell, part_datetime) and
@@ -77,11 +182,343 @@ def _fix_partial_datetime(constraint):
             cell.point.second == _check_pdt_second(cell, part_datetime) and
             cell.point.microsecond ==
             _check_pdt_microsecond(cell, part_datetime))
+
+
+def _fix_partial_datetime(constraint):
+    if isinstance(constraint._coord_values['time'], iris.time.PartialDateTime):
+        part_datetime = constraint._coord_values['time']
+        new_constraint = iris.Constraint(
+            time=_PartialDateTimeMatch(part_datetime))
         return new_constraint
     else:
         return constraint
 
 
+_DATE_FIELDS = ('year', 'month', 'day', 'hour', 'minute', 'second')
+_DATE_MINIMUMS = (None, 1, 1, 0, 0, 0)
+_DATE_MAXIMUMS = (None, 12, 31, 23, 59, 59)
+
+
+def _value_time_range(value):
+    """
+    Returns the (start, end) date tuples that a single time constraint
+    value can match, or None if the range cannot be bounded.
+    """
+    if isinstance(value, _PartialDateTimeMatch):
+        value = value.partial_datetime
+    if isinstance(value, iris.time.PartialDateTime):
+        fields = []
+        for field in _DATE_FIELDS:
+            if getattr(value, field, None) is None:
+                break
+            fields.append(getattr(value, field))
+        if not fields:
+            return None
+        start = tuple(fields) + _DATE_MINIMUMS[len(fields):]
+        end = tuple(fields) + _DATE_MAXIMUMS[len(fields):]
+        return start, end
+    if all(hasattr(value, field) for field in _DATE_FIELDS):
+        date = tuple(getattr(value, field) for field in _DATE_FIELDS)
+        return date, date
+    return None
+
+
+def _constraint_time_range(constraint):
+    """
+    Works out the range of dates that a constraint's time condition can
+    match. Only partial datetimes with a year, datetime-like values, and
+    collections of these, optionally combined with '&', can be bounded;
+    arbitrary callables cannot.
+
+    Args:
+        constraint: an iris.Constraint.
+
+    Returns:
+        a (start, end) tuple of date tuples, or None if the constraint
+        does not limit time in a way that can be determined.
+    """
+    if isinstance(constraint, iris._constraints.ConstraintCombination):
+        if constraint.operator is not operator.__and__:
+            return None
+        lhs = _constraint_time_range(constraint.lhs)
+        rhs = _constraint_time_range(constraint.rhs)
+        if lhs is None or rhs is None:
+            return lhs or rhs
+        return max(lhs[0], rhs[0]), min(lhs[1], rhs[1])
+    coord_values = getattr(constraint, '_coord_values', None) or {}
+    value = coord_values.get('time')
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        ranges = [_value_time_range(item) for item in value]
+    else:
+        ranges = [_value_time_range(value)]
+    if not ranges or None in ranges:
+        return None
+    return (min(time_range[0] for time_range in ranges),
+            max(time_range[1] for time_range in ranges))
+
+
+def _find_time_variable(dataset):
+    for variable in dataset.variables.values():
+        if (getattr(variable, 'standard_name', None) == 'time' or
+                getattr(variable, 'axis', None) == 'T'):
+            return variable
+    return dataset.variables.get('time')
+
+
+_TimeHeader = namedtuple('_TimeHeader', ['units', 'points', 'bounds'])
+
+
+def _read_time_header(path):
+    """
+    Reads the units, the first two and the last points, and their bounds,
+    of a netCDF file's time variable alone, without building any cubes.
+    Headers are cached by file signature, so pruning a file and probing
+    its times for a constraint decode its header once.
+
+    Args:
+        path: the netCDF filename to read.
+
+    Returns:
+        a _TimeHeader of the cf_units.Unit, the points and the bounds (or
+        None) of those times, or None if the file has no time variable or
+        its units, calendar or times cannot be used.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _cached_time_header(os.path.abspath(path),
+                               (stat.st_ino, stat.st_size, stat.st_mtime))
+
+
+@lru_cache(maxsize=256)
+def _cached_time_header(path, signature):
+    # signature only keys the cache, so a changed file is read again.
+    try:
+        with _FILE_POOL.dataset(path) as dataset:
+            time_var = _find_time_variable(dataset)
+            if time_var is None or not time_var.shape or \
+                    time_var.shape[0] == 0:
+                return None
+            units = cf_units.Unit(time_var.units,
+                                  getattr(time_var, 'calendar', 'standard'))
+            last = time_var.shape[0] - 1
+            rows = sorted({0, min(1, last), last})
+            points = time_var[rows]
+            bounds = None
+            bounds_name = getattr(time_var, 'bounds', None)
+            if bounds_name in dataset.variables:
+                bounds = dataset.variables[bounds_name][rows]
+    except (IOError, OSError, AttributeError, IndexError, ValueError,
+            RuntimeError):
+        return None
+    values = [np.ma.ravel(points)]
+    if bounds is not None:
+        values.append(np.ma.ravel(bounds))
+    values = np.ma.concatenate(values)
+    # Masked or NaN times cannot be compared; the file is then opened
+    # with iris instead.
+    if np.ma.is_masked(values) or \
+            not np.all(np.isfinite(np.ma.getdata(values))):
+        return None
+    points = np.ma.getdata(points)
+    points.flags.writeable = False
+    if bounds is not None:
+        bounds = np.ma.getdata(bounds)
+        bounds.flags.writeable = False
+    return _TimeHeader(units, points, bounds)
+
+
+def _read_time_span(path):
+    """
+    Reads the first and last time of a netCDF file from its time
+    variable alone, without building any cubes.
+
+    Args:
+        path: the netCDF filename to read.
+
+    Returns:
+        a (start, end) tuple of date tuples, or None if the time span
+        could not be read.
+    """
+    header = _read_time_header(path)
+    if header is None:
+        return None
+    values = header.points
+    if header.bounds is not None:
+        values = np.concatenate([values, np.ravel(header.bounds)])
+    time_units = str(header.units)
+    calendar = header.units.calendar
+    try:
+        return (_date_key(values.min(), time_units, calendar),
+                _date_key(values.max(), time_units, calendar))
+    except (ValueError, OverflowError):
+        return None
+
+
+# CMIP/DRS file names end with the time range they hold, e.g.
+# tas_Amon_UKESM1-0-LL_historical_r1i1p1f2_gn_185001-194912.nc
+DRS_DATE_PATTERN = (r'_(?P<start>\d{4}(?:\d{2}){0,5})'
+                    r'-(?P<end>\d{4}(?:\d{2}){0,5})(?:-clim)?\.[^.]+$')
+
+
+def _date_digits(digits, defaults):
+    fields = [int(digits[:4])]
+    fields.extend(int(digits[i:i + 2]) for i in range(4, len(digits), 2))
+    return tuple(fields) + defaults[len(fields):]
+
+
+def parse_filename_dates(filename, patterns=None):
+    """
+    Parses the time range encoded in a file name, such as the
+    ``185001-194912`` in CMIP/DRS style names, without opening the file.
+
+    Args:
+        filename: the file name or path to parse.
+
+        patterns (optional): a regular expression, or list of them, each
+        with named groups 'start' and 'end' capturing dates written as
+        YYYY[MM[DD[hh[mm[ss]]]]]. The first pattern that matches is
+        used. Defaults to DRS_DATE_PATTERN.
+
+    Returns:
+        a (start, end) tuple of (year, month, day, hour, minute, second)
+        tuples, with the end date extended to the end of its period, or
+        None if no pattern matches.
+    """
+    if patterns is None:
+        patterns = [DRS_DATE_PATTERN]
+    elif isinstance(patterns, string_types) or hasattr(patterns, 'search'):
+        patterns = [patterns]
+    basename = os.path.basename(filename)
+    for pattern in patterns:
+        match = re.search(pattern, basename)
+        if match:
+            return (_date_digits(match.group('start'), _DATE_MINIMUMS),
+                    _date_digits(match.group('end'), _DATE_MAXIMUMS))
+    return None
+
+
+def _filename_patterns(filename_dates):
+    """
+    Converts the filename_dates argument of the loaders to a list of
+    patterns, or None if filename dates are not used.
+    """
+    if not filename_dates:
+        return None
+    if filename_dates is True:
+        return [DRS_DATE_PATTERN]
+    if isinstance(filename_dates, string_types) or \
+            hasattr(filename_dates, 'search'):
+        return [filename_dates]
+    return list(filename_dates)
+
+
+def _file_time_span(path, catalog=None, patterns=None):
+    """
+    Returns a file's time span from its name when it matches one of
+    patterns, from the catalog when it has a current entry for the
+    file, and otherwise from the file's netCDF header.
+    """
+    if patterns:
+        span = parse_filename_dates(path, patterns)
+        if span is not None:
+            return span
+    if catalog is not None and catalog.is_current(path):
+        return catalog.time_span(path)
+    if path.endswith('.nc'):
+        return _read_time_span(path)
+    return None
+
+
+def _sort_paths(paths, catalog=None, patterns=None):
+    """
+    Orders filenames by the start of their time span, taken from their
+    names where possible. Files with an unknown span keep their
+    relative order at the end of the list.
+    """
+    timed = []
+    untimed = []
+    for path in paths:
+        span = _file_time_span(path, catalog, patterns)
+        if span is None:
+            untimed.append(path)
+        else:
+            timed.append((span[0], path))
+    timed.sort(key=lambda item: item[0])
+    return [path for _, path in timed] + untimed
+
+
+def _iter_pruned(paths, constraint, catalog=None, patterns=None):
+    """
+    Drops the files whose time span cannot intersect the time range of
+    constraint, so they never need to be opened. Files whose span is
+    unknown are always kept.
+
+    Args:
+        paths: an iterable of filenames.
+
+        constraint: the iris.Constraint the files will be loaded with.
+
+        catalog (optional): a Catalog to take time spans from.
+
+        patterns (optional): file name date patterns to take time spans
+        from before falling back to the catalog or file headers.
+
+    Yields:
+        the filenames that may hold data matching constraint, in the
+        order of paths.
+    """
+    time_range = _constraint_time_range(constraint)
+    for path in paths:
+        if time_range is None:
+            yield path
+            continue
+        span = _file_time_span(path, catalog, patterns)
+        if span is None or (span[0] <= time_range[1] and
+                            span[1] >= time_range[0]):
+            yield path
+
+
+def _prune_paths(paths, constraint, catalog=None, patterns=None):
+    """
+    Returns the list of filenames kept by _iter_pruned().
+    """
+    return list(_iter_pruned(paths, constraint, catalog, patterns))
+
+
+def _constrain_paths(paths, constraint, catalog=None, patterns=None):
+    """
+    Prunes paths that cannot match constraint and normalises the
+    constraint against the first remaining file. Apart from that first
+    file, paths are still consumed lazily.
+
+    Args:
+        paths: an iterable of filenames.
+
+        constraint: the iris.Constraint to load with, or None.
+
+        catalog (optional): a Catalog to take time spans from.
+
+        patterns (optional): file name date patterns to take time spans
+        from.
+
+    Returns:
+        (paths, constraint): an iterator over the remaining filenames
+        and the constraint to load them with.
+    """
+    if constraint is None:
+        return iter(paths), constraint
+    paths = _iter_pruned(paths, constraint, catalog, patterns)
+    first_path = next(paths, None)
+    if first_path is None:
+        return iter(()), constraint
+    constraint = _normalise_constraint(constraint, first_path)
+    return itertools.chain([first_path], paths), constraint
+
+
 def _constraint_compatible(constraint, cube):
     try:
         cube.extract(constraint)
@@ -90,6 +527,97 @@ def _constraint_compatible(constraint, cube):
         return False
 
 
+# Normalised constraints, keyed by the original constraint and then by
+# (time units, calendar, has bounds) of the files they were checked on.
+_NORMALISED_CONSTRAINTS = weakref.WeakKeyDictionary()
+_NORMALISED_LOCK = threading.Lock()
+
+
+def _header_time_coord(path):
+    """
+    Builds the first two points (and bounds) of a netCDF file's time
+    coordinate from its time variable, without loading any cubes.
+    """
+    if not path.endswith('.nc'):
+        return None
+    header = _read_time_header(path)
+    if header is None:
+        return None
+    bounds = None if header.bounds is None else header.bounds[:2]
+    try:
+        return iris.coords.DimCoord(header.points[:2], standard_name='time',
+                                    units=header.units, bounds=bounds)
+    except ValueError:
+        # Repeated times cannot form a DimCoord; the caller then probes
+        # the file with iris instead.
+        return None
+
+
+def _time_probe(path):
+    """
+    Returns a small cube holding only the start of a file's time
+    coordinate, enough to test a constraint against. The netCDF header
+    is read directly where possible, otherwise the file is loaded
+    lazily.
+    """
+    time_coord = _header_time_coord(path)
+    if time_coord is None:
+        for cube in _load_raw(path):
+            for coord in cube.coords():
+                if coord.units.is_time_reference() and coord.ndim == 1:
+                    time_coord = coord[:2].copy()
+                    time_coord.standard_name = 'time'
+                    break
+            if time_coord is not None:
+                break
+    if time_coord is None:
+        return None
+    if not isinstance(time_coord, iris.coords.DimCoord):
+        # Files with repeated times hold an auxiliary time coordinate.
+        return iris.cube.Cube(np.zeros(time_coord.shape),
+                              aux_coords_and_dims=[(time_coord, 0)])
+    return iris.cube.Cube(np.zeros(time_coord.shape),
+                          dim_coords_and_dims=[(time_coord, 0)])
+
+
+def _normalise_constraint(constraint, path):
+    """
+    Checks, once per load, whether a constraint can be applied to the
+    time coordinates of the files being loaded and rewrites partial
+    datetime constraints that cannot. The check runs on header metadata
+    only and its result is cached per constraint, time units, calendar
+    and presence of bounds.
+
+    Args:
+        constraint: the iris.Constraint to check.
+
+        path: a representative file of those being loaded.
+
+    Returns:
+        the constraint to load the files with.
+    """
+    coord_values = getattr(constraint, '_coord_values', None) or {}
+    if 'time' not in coord_values:
+        return constraint
+    probe = _time_probe(path)
+    if probe is None:
+        return constraint
+    time_coord = probe.coord('time')
+    key = (time_coord.units.origin, time_coord.units.calendar,
+           time_coord.has_bounds())
+    with _NORMALISED_LOCK:
+        cached = _NORMALISED_CONSTRAINTS.get(constraint, {})
+        if key in cached:
+            return cached[key]
+    if _constraint_compatible(constraint, probe):
+        normalised = constraint
+    else:
+        normalised = _fix_partial_datetime(constraint)
+    with _NORMALISED_LOCK:
+        _NORMALISED_CONSTRAINTS.setdefault(constraint, {})[key] = normalised
+    return normalised
+
+
 def _parse_directory(directory):
     """
     Parses the string representing the directory, makes sure a '/'
@@ -117,6 +645,81 @@ def _parse_directory(directory):
         return directory
 
 
+def _walk_files(directory, relative, depth, filetype, include, exclude,
+                max_depth):
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except OSError:
+        return
+    subdirectories = []
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        relative_path = relative + entry.name
+        if exclude and any(fnmatch(relative_path, pattern)
+                           for pattern in exclude):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            if max_depth is None or depth < max_depth:
+                subdirectories.append((entry.path, relative_path + '/'))
+        elif entry.is_dir():
+            # Linked directories, such as CMIP latest -> vYYYYMMDD, would
+            # yield their files a second time and can form cycles.
+            continue
+        elif entry.name.endswith(filetype):
+            if not include or any(fnmatch(relative_path, pattern)
+                                  for pattern in include):
+                yield entry.path
+    for path, relative_path in subdirectories:
+        for filename in _walk_files(path, relative_path, depth + 1,
+                                    filetype, include, exclude, max_depth):
+            yield filename
+
+
+def iter_files(directory, filetype='', recursive=False, include=None,
+               exclude=None, max_depth=None):
+    """
+    Lazily finds the files in a directory using os.scandir, optionally
+    walking nested directories such as
+    model/experiment/member/table/variable/grid/version/ trees. Paths are
+    yielded as they are found so that loading can start before the walk
+    has finished. Hidden files and directories are skipped, and symbolic
+    links to directories are not followed.
+
+    Args:
+        directory: the directory to search.
+
+        filetype (optional): the extension that files must end with.
+
+        recursive (optional): if True, search subdirectories too.
+
+        include (optional): a glob pattern, or list of them, matched
+        against each file's path relative to directory. Only files
+        matching one of them are yielded.
+
+        exclude (optional): a glob pattern, or list of them, matched
+        against each file's or subdirectory's relative path. Matching
+        files are skipped and matching subdirectories are not entered.
+
+        max_depth (optional): the deepest level of subdirectory to
+        search when recursive, 0 being directory itself. None searches
+        every level.
+
+    Yields:
+        the path of each matching file, directory by directory, in name
+        order within each directory.
+    """
+    if isinstance(include, string_types):
+        include = [include]
+    if isinstance(exclude, string_types):
+        exclude = [exclude]
+    if not recursive:
+        max_depth = 0
+    directory = _parse_directory(directory)
+    return _walk_files(directory, '', 0, filetype, include, exclude,
+                       max_depth)
+
+
 def _sort_by_date(time_coord):
     """
     Private sorting function used by _file
@@ -152,7 +755,7 @@ def file_sort_by_earliest_date(cube_filename):
     Returns:
         datetime object of selected Cubes start time.
     """
-    raw_cubes = iris.load_raw(cube_filename)
+    raw_cubes = _load_raw(cube_filename)
     if isinstance(raw_cubes, iris.cube.CubeList):
         for cube in raw_cubes:
             if isinstance(cube.standard_name, string_types):
@@ -185,7 +788,720 @@ def sort_by_earliest_date(cube):
             return time_origin
 
 
-def load_from_dir(directory, filetype, constraint=None):
+def _first_time_value(cube):
+    """
+    Returns the earliest time of a cube's first time coordinate, using
+    its lower bounds where present, and that coordinate's units. The
+    value is left as a lazy dask scalar if the coordinate is lazy.
+    """
+    for time_coord in cube.coords():
+        if time_coord.units.is_time_reference():
+            if time_coord.has_bounds():
+                values = time_coord.core_bounds()
+            else:
+                values = time_coord.core_points()
+            if isinstance(values, da.Array):
+                return da.min(values), time_coord.units
+            return np.min(values), time_coord.units
+    return None, None
+
+
+def first_time_order(cubes):
+    """
+    Works out the order that sorts cubes by their first time point (or
+    lower bound), rather than by the origin of their time units.
+
+    The first times are computed together, so lazy coordinates are only
+    realised once in a single dask computation. Times are converted to a
+    common epoch per calendar with one vectorised unit conversion and
+    ordered with a single stable argsort. Cubes with different calendars
+    are ordered by their calendar dates. Cubes without a time coordinate
+    are placed last.
+
+    Args:
+        cubes: a list or CubeList of cubes.
+
+    Returns:
+        a numpy array of the indices that sort cubes from earliest to
+        latest.
+    """
+    firsts = [_first_time_value(cube) for cube in cubes]
+    values = dask.compute(*[value for value, _ in firsts])
+    values = np.array([np.nan if value is None else float(value)
+                       for value in values], dtype=np.float64)
+    timed = np.array([units is not None for _, units in firsts], dtype=bool)
+    calendars = sorted({units.calendar for _, units in firsts
+                        if units is not None})
+    epochs = np.full(len(firsts), np.inf)
+    for calendar in calendars:
+        epoch = cf_units.Unit('days since 1970-01-01 00:00:00', calendar)
+        unit_groups = {}
+        for index, (_, units) in enumerate(firsts):
+            if units is not None and units.calendar == calendar:
+                unit_groups.setdefault(units.origin, []).append(index)
+        for origin, indices in unit_groups.items():
+            indices = np.array(indices)
+            epochs[indices] = cf_units.Unit(origin, calendar).convert(
+                values[indices], epoch)
+    if len(calendars) <= 1:
+        return np.argsort(epochs, kind='stable')
+    # Days since an epoch are not comparable between calendars, so
+    # order by calendar date instead.
+    fields = np.zeros((6, len(firsts)), dtype=np.int64)
+    for calendar in calendars:
+        indices = np.array([index for index, (_, units) in enumerate(firsts)
+                            if units is not None and
+                            units.calendar == calendar])
+        dates = cftime.num2date(epochs[indices],
+                                'days since 1970-01-01 00:00:00', calendar)
+        for row, field in enumerate(_DATE_FIELDS):
+            fields[row, indices] = [getattr(date, field) for date in dates]
+    untimed = ~timed
+    return np.lexsort(tuple(fields[::-1]) + (untimed,))
+
+
+def _realised_nbytes(cube):
+    """
+    Returns the number of bytes of a cube's data and coordinates that
+    are held in memory rather than lazily.
+    """
+    nbytes = 0
+    if not cube.has_lazy_data():
+        nbytes += cube.core_data().nbytes
+    for coord in cube.coords():
+        if not coord.has_lazy_points():
+            nbytes += coord.core_points().nbytes
+        if coord.has_bounds() and not coord.has_lazy_bounds():
+            nbytes += coord.core_bounds().nbytes
+    return nbytes
+
+
+class _CubeCache(object):
+    """
+    A thread-safe LRU cache of the cubes loaded from each file, keyed by
+    path, modification time, size and constraint. The cache is bounded
+    both by its number of entries and by the bytes of realised data and
+    coordinates it holds, and always hands out copies so that callers
+    cannot modify the cached cubes.
+
+    Args:
+        max_entries (optional): the maximum number of files cached, 0
+        (the default) disables the cache.
+
+        max_bytes (optional): the maximum number of bytes of realised
+        data held, None for no limit.
+    """
+    def __init__(self, max_entries=0, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def key(self, path, constraint):
+        if not self.max_entries:
+            return None
+        if isinstance(constraint, list):
+            constraint = tuple(constraint)
+        try:
+            hash(constraint)
+            stat = os.stat(path)
+        except (TypeError, OSError):
+            return None
+        return (os.path.abspath(path), stat.st_mtime, stat.st_size,
+                constraint)
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        return [cube.copy() for cube in entry[0]]
+
+    def put(self, key, cubes):
+        if key is None:
+            return
+        cubes = [cube.copy() for cube in cubes]
+        nbytes = sum(_realised_nbytes(cube) for cube in cubes)
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (cubes, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and
+                 self._nbytes > self.max_bytes)):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._nbytes -= nbytes
+
+    def configure(self, max_entries, max_bytes):
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+
+_CUBE_CACHE = _CubeCache()
+
+
+def configure_cube_cache(max_entries=128, max_bytes=2 ** 30):
+    """
+    Enables, resizes or disables the in-process cache of the cubes loaded
+    from each file. Repeated or overlapping loads then reuse the cubes of
+    files that have already been read, as long as the file is unchanged
+    and the same constraint is used. Cached cubes are returned as copies.
+    With the 'process' executor each worker process has its own cache.
+
+    Args:
+        max_entries (optional): the maximum number of files to cache, 128
+        by default. 0 disables the cache.
+
+        max_bytes (optional): the maximum number of bytes of realised
+        data and coordinates to hold, 1 GiB by default. None for no
+        limit.
+    """
+    _CUBE_CACHE.configure(max_entries, max_bytes)
+
+
+def clear_cube_cache():
+    """
+    Empties the in-process cache of loaded cubes.
+    """
+    _CUBE_CACHE.clear()
+
+
+def _descriptor_limit():
+    """
+    Returns the soft limit on open file descriptors, or None where it
+    cannot be read.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return None
+    return soft
+
+
+class _FileHandle(object):
+    def __init__(self, dataset, signature):
+        self.dataset = dataset
+        self.signature = signature
+        self.users = 0
+        self.stale = False
+
+
+class _FileHandlePool(object):
+    """
+    An LRU pool of open netCDF4 datasets, so that repeated reads of the
+    same files reuse their handles instead of opening and closing them
+    each time. The netCDF-C library is not thread-safe, so every open,
+    read and close made through the pool holds one module-level netCDF
+    lock (iris's own lock where iris has one), and only one thread reads
+    any file at a time. Handles are reopened if their file changes on
+    disk. Handles in use are never closed, so the pool may briefly
+    exceed its limit.
+
+    Args:
+        max_open_files (optional): the maximum number of idle handles
+        kept open, 0 (the default) opens and closes files on every read.
+    """
+    def __init__(self, max_open_files=0):
+        self.max_open_files = max_open_files
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, path, signature):
+        handle = self._handles.get(path)
+        if handle is not None and handle.signature != signature:
+            del self._handles[path]
+            handle.stale = True
+            if not handle.users:
+                handle.dataset.close()
+            handle = None
+        return handle
+
+    def _acquire(self, path):
+        stat = os.stat(path)
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime)
+        with self._lock:
+            handle = self._lookup(path, signature)
+            if handle is not None:
+                handle.users += 1
+                self._handles.move_to_end(path)
+                return handle
+        dataset = netCDF4.Dataset(path)
+        with self._lock:
+            handle = self._lookup(path, signature)
+            if handle is None:
+                handle = _FileHandle(dataset, signature)
+                self._handles[path] = handle
+                dataset = None
+            handle.users += 1
+            self._handles.move_to_end(path)
+            self._evict()
+        if dataset is not None:
+            dataset.close()
+        return handle
+
+    def _release(self, handle):
+        with self._lock:
+            handle.users -= 1
+            if handle.stale and not handle.users:
+                handle.dataset.close()
+            self._evict()
+
+    def _evict(self):
+        excess = len(self._handles) - self.max_open_files
+        for path, handle in list(self._handles.items()):
+            if excess <= 0:
+                break
+            if not handle.users:
+                del self._handles[path]
+                handle.dataset.close()
+                excess -= 1
+
+    @contextlib.contextmanager
+    def dataset(self, path):
+        """
+        Context manager giving use of the open netCDF4 dataset for path,
+        holding the netCDF lock for as long as it is in use.
+        """
+        with _NETCDF_LOCK:
+            if not self.max_open_files:
+                with netCDF4.Dataset(path) as dataset:
+                    yield dataset
+                return
+            handle = self._acquire(os.path.abspath(path))
+            try:
+                yield handle.dataset
+            finally:
+                self._release(handle)
+
+    def configure(self, max_open_files):
+        with _NETCDF_LOCK, self._lock:
+            self.max_open_files = max_open_files
+            self._evict()
+
+    def close(self):
+        with _NETCDF_LOCK, self._lock:
+            for handle in self._handles.values():
+                handle.stale = True
+                if not handle.users:
+                    handle.dataset.close()
+            self._handles.clear()
+
+
+def _pool_size(max_open_files):
+    """
+    Caps a file pool size at half the process's open file limit.
+    """
+    limit = _descriptor_limit()
+    if limit is not None:
+        max_open_files = min(max_open_files, limit // 2)
+    return max_open_files
+
+
+_FILE_POOL = _FileHandlePool(_pool_size(256))
+
+
+def configure_file_pool(max_open_files=256):
+    """
+    Resizes or disables the pool of open netCDF files that cube_helper
+    reads headers, time coordinates, the data of loaded cubes and
+    reference data through. The pool is on by default. Pooled files stay
+    open between reads, which avoids reopening them on every chunk of a
+    computation, but a file held open cannot be overwritten in place by
+    the same process until the pool is closed. With the 'process'
+    executor each worker process has its own pool for reading headers,
+    while the data of the cubes returned is read through the pool of the
+    calling process.
+
+    Args:
+        max_open_files (optional): the maximum number of files kept open,
+        256 by default and never more than half the process's open file
+        limit. 0 disables the pool.
+    """
+    _FILE_POOL.configure(_pool_size(max_open_files))
+
+
+def close_file_pool():
+    """
+    Closes every idle file held open by the file pool, leaving its size
+    unchanged.
+    """
+    _FILE_POOL.close()
+
+
+class _PooledProxy(object):
+    """
+    A lazy, picklable view of a whole netCDF variable, read through the
+    file pool only when data is needed.
+    """
+    def __init__(self, path, var_name, shape, dtype):
+        self.path = path
+        self.var_name = var_name
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __getitem__(self, keys):
+        with _FILE_POOL.dataset(self.path) as dataset:
+            data = dataset.variables[self.var_name][keys]
+        return data.astype(self.dtype, copy=False)
+
+
+def _pool_data(cubes, path):
+    """
+    Points the lazy data of cubes loaded from a netCDF file at the file
+    pool, keeping their chunks, so that computing them reuses pooled
+    handles instead of opening the file for every chunk. Cubes whose
+    data is not a whole variable of the file, such as those subset by a
+    constraint, keep iris's own proxies.
+
+    Args:
+        cubes: the Cubes loaded from path, changed in place.
+
+        path: the filename the cubes were loaded from.
+
+    Returns:
+        cubes.
+    """
+    if not path.endswith('.nc'):
+        return cubes
+    try:
+        with _FILE_POOL.dataset(path) as dataset:
+            shapes = {name: variable.shape
+                      for name, variable in dataset.variables.items()}
+    except (IOError, OSError, RuntimeError):
+        return cubes
+    for cube in cubes:
+        if not cube.has_lazy_data() or \
+                shapes.get(cube.var_name) != cube.shape:
+            continue
+        proxy = _PooledProxy(path, cube.var_name, cube.shape, cube.dtype)
+        # asarray=False keeps masks; no meta is passed, as older dask
+        # releases do not accept one.
+        cube.data = da.from_array(proxy, chunks=cube.core_data().chunks,
+                                  asarray=False, name=False)
+    return cubes
+
+
+def _load_path(path, constraint=None, raw_cubes=None):
+    """
+    Loads the cubes held in a single file. A file that does not merge
+    to a single cube falls back to its raw cubes, keeping only those
+    with a standard_name. Files already held in the cube cache are not
+    read again.
+
+    Args:
+        path: the filename to load.
+
+        constraint (optional): an iris.Constraint to load the file with.
+
+        raw_cubes (optional): the unconstrained raw CubeList already read
+        from the file, for example while cataloguing it, to use instead
+        of reading the file.
+
+    Returns:
+        a list of the Cubes loaded from the file.
+    """
+    key = _CUBE_CACHE.key(path, constraint)
+    cubes = _CUBE_CACHE.get(key)
+    if cubes is not None:
+        return cubes
+    if raw_cubes is None:
+        raw_cubes = _load_raw(path, constraint)
+    elif constraint is not None:
+        raw_cubes = raw_cubes.extract(constraint)
+    # The file is read once; merging the raw cubes decides whether it
+    # holds a single cube, as iris.load_cube would, without parsing the
+    # file a second time for the fallback.
+    cubes = _pool_data(_merge_or_filter(raw_cubes), path)
+    _CUBE_CACHE.put(key, cubes)
+    return cubes
+
+
+def _merge_or_filter(cubes):
+    """
+    Merges a file's cubes to a single cube where possible, otherwise
+    keeps those with a standard_name, as _load_path() does.
+    """
+    try:
+        return [cubes.merge_cube()]
+    except (MergeError, ValueError):
+        return [cube for cube in cubes
+                if isinstance(cube.standard_name, str)]
+
+
+def _route_path(path, constraints):
+    """
+    Reads a file once and routes its cubes to every matching request.
+
+    Args:
+        path: the filename to load.
+
+        constraints: a dict of request names to constraints (or None to
+        take every cube in the file).
+
+    Returns:
+        a dict of request names to the list of Cubes loaded from the
+        file for that request. No Cube is given to more than one
+        request, so each request can be equalised independently.
+    """
+    raw_cubes = _pool_data(_load_raw(path), path)
+    routed = {}
+    handed_out = set()
+    for name, constraint in constraints.items():
+        if constraint is None:
+            selected = raw_cubes
+        else:
+            selected = raw_cubes.extract(constraint)
+        cubes = []
+        for cube in _merge_or_filter(selected):
+            # Extracting and filtering can return the raw cubes
+            # themselves, so a cube another request already holds is
+            # copied; copies keep their data lazy.
+            if id(cube) in handed_out:
+                cube = cube.copy()
+            handed_out.add(id(cube))
+            cubes.append(cube)
+        routed[name] = cubes
+    return routed
+
+
+def _map_paths(func, paths, workers=None, executor='thread'):
+    """
+    Applies func to every path, either serially or across a pool of
+    workers. paths may be a lazy iterable; it is consumed as results are
+    requested, with at most twice as many files in flight as there are
+    workers, so opening files overlaps with producing their paths.
+
+    Args:
+        func: a callable taking a single path.
+
+        paths: an iterable of filenames.
+
+        workers (optional): the number of workers to use, None or 1
+        loads the files serially.
+
+        executor (optional): the pool backend, either 'thread' or
+        'process'.
+
+    Yields:
+        (path, result) pairs, always in the order of paths.
+    """
+    if not workers or workers == 1:
+        for path in paths:
+            yield path, func(path)
+        return
+    try:
+        pool_class = _EXECUTORS[executor]
+    except KeyError:
+        raise ValueError("executor must be one of {}, not '{}'".format(
+            sorted(_EXECUTORS), executor))
+    with pool_class(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for path in paths:
+                pending.append((path, pool.submit(func, path)))
+                if len(pending) >= 2 * workers:
+                    path, future = pending.popleft()
+                    yield path, future.result()
+            while pending:
+                path, future = pending.popleft()
+                yield path, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def _check_sort(sort):
+    if sort not in ('origin', 'time'):
+        raise ValueError("sort must be 'origin' or 'time', not "
+                         "'{}'".format(sort))
+
+
+def _order_loaded(results, sort='origin'):
+    """
+    Flattens per-file load results into a list of cubes and a matching
+    list of filenames, sorted from earliest to latest date.
+
+    Args:
+        results: an iterable of (path, cubes) pairs.
+
+        sort (optional): 'origin' or 'time', see _load_paths().
+
+    Returns:
+        loaded_cubes, cube_files: a list of the loaded Cubes and a list
+        of their respective filenames.
+    """
+    loaded_cubes = []
+    cube_files = []
+    for path, cubes in results:
+        for cube in cubes:
+            loaded_cubes.append(cube)
+            cube_files.append(path)
+    # Each file is opened once; the cubes and their paths are reordered
+    # together so cube_files[i] always matches loaded_cubes[i].
+    if sort == 'time':
+        order = first_time_order(loaded_cubes)
+    else:
+        keys = [sort_by_earliest_date(cube) for cube in loaded_cubes]
+        order = sorted(range(len(keys)), key=lambda index: keys[index])
+    loaded_cubes = [loaded_cubes[index] for index in order]
+    cube_files = [cube_files[index] for index in order]
+    return loaded_cubes, cube_files
+
+
+def _index_paths(catalog, paths, workers=None, executor='thread'):
+    """
+    Brings a catalog up to date for paths, loading only the files that
+    are new or have changed, and saves it if anything changed. The raw
+    cubes loaded are handed back so that the files are not read again.
+
+    Args:
+        catalog: the Catalog to update.
+
+        paths: a list of the filenames that should be indexed.
+
+        workers (optional): the number of workers to load files with.
+
+        executor (optional): the pool backend, either 'thread' or
+        'process'.
+
+    Returns:
+        a dict of filenames to the raw CubeList loaded from each file
+        that was indexed.
+    """
+    changed = catalog.prune()
+    stale = [path for path in paths if not catalog.is_current(path)]
+    preloaded = {}
+    for path, raw_cubes in _map_paths(_load_raw, stale, workers, executor):
+        catalog.add(path, raw_cubes)
+        preloaded[path] = raw_cubes
+    if changed or preloaded:
+        catalog.save()
+    return preloaded
+
+
+def _load_paths(paths, constraint=None, workers=None, executor='thread',
+                sort='origin', preloaded=None):
+    """
+    Loads every file in paths and pairs each loaded cube with the file
+    it came from, sorted from earliest to latest date.
+
+    Args:
+        paths: an iterable of filenames to load.
+
+        constraint (optional): an iris.Constraint to load the files with.
+
+        workers (optional): the number of workers to load files with.
+
+        executor (optional): the pool backend, either 'thread' or
+        'process'.
+
+        sort (optional): 'origin' to sort by the origin of each cube's
+        time units, or 'time' to sort by each cube's first time point.
+
+        preloaded (optional): a dict of filenames to raw CubeLists
+        already read from them, which are not read again.
+
+    Returns:
+        loaded_cubes, cube_files: a list of the loaded Cubes and a list
+        of their respective filenames.
+    """
+    _check_sort(sort)
+    load = partial(_load_path, constraint=constraint)
+    if not preloaded:
+        results = _map_paths(load, paths, workers, executor)
+    else:
+        paths = list(paths)
+        loaded = dict(_map_paths(load, [path for path in paths
+                                        if path not in preloaded],
+                                 workers, executor))
+        results = [(path, loaded[path] if path in loaded else
+                    load(path, raw_cubes=preloaded[path]))
+                   for path in paths]
+    return _order_loaded(results, sort)
+
+
+def _dir_paths(directory, filetype, constraint=None, catalog=None,
+               filename_dates=None, recursive=False, include=None,
+               exclude=None, max_depth=None, workers=None,
+               executor='thread'):
+    """
+    Finds, orders and prunes the files load_from_dir() will load, and
+    normalises its constraint. The arguments are those of
+    load_from_dir().
+
+    Returns:
+        (paths, constraint, preloaded): an iterator over the filenames to
+        load, the constraint to load them with and a dict of the raw
+        CubeLists read from files newly added to the catalog, so that
+        each file is opened once.
+    """
+    directory = _parse_directory(directory)
+    cube_paths = iter_files(directory, filetype, recursive, include,
+                            exclude, max_depth)
+    patterns = _filename_patterns(filename_dates)
+    preloaded = {}
+    if catalog:
+        if not isinstance(catalog, Catalog):
+            catalog = Catalog(directory)
+        cube_paths = list(cube_paths)
+        preloaded = _index_paths(catalog, cube_paths, workers, executor)
+    else:
+        catalog = None
+    if catalog is not None or patterns:
+        cube_paths = _sort_paths(cube_paths, catalog, patterns)
+    cube_paths, constraint = _constrain_paths(cube_paths, constraint,
+                                              catalog, patterns)
+    return cube_paths, constraint, preloaded
+
+
+def _filelist_paths(paths, filetype, constraint=None, filename_dates=None):
+    """
+    Filters, orders and prunes the files load_from_filelist() will load,
+    and normalises its constraint. The arguments are those of
+    load_from_filelist().
+
+    Returns:
+        (paths, constraint): a list of the filenames to load and the
+        constraint to load them with.
+    """
+    paths = [filename for filename in paths if filename.endswith(filetype)]
+    patterns = _filename_patterns(filename_dates)
+    if patterns:
+        paths = _sort_paths(paths, patterns=patterns)
+    if constraint is not None:
+        paths = _prune_paths(paths, constraint, patterns=patterns)
+        if paths:
+            constraint = _normalise_constraint(constraint, paths[0])
+    return paths, constraint
+
+
+def load_from_dir(directory, filetype, constraint=None, workers=None,
+                  executor='thread', catalog=None, filename_dates=None,
+                  sort='origin', recursive=False, include=None,
+                  exclude=None, max_depth=None):
     """
     Loads a set of cubes from a given directory, single cubes are loaded
     and returned as a CubeList.
@@ -199,52 +1515,62 @@ def load_from_dir(directory, filetype, constraint=None):
         Of files found in the dataset.
 
         constraint (optional): a string specifying any constraints
-        You wish to load the dataset with.
+        You wish to load the dataset with. Files whose time span cannot
+        match a time constraint are skipped without being loaded.
+
+        workers (optional): the number of files to load concurrently.
+        None (the default) loads the files one after another.
+
+        executor (optional): 'thread' (the default) or 'process', the
+        type of pool used when workers is set. The netCDF library is not
+        thread-safe, so threads never read netCDF files at the same time
+        and only overlap the rest of the work. The process backend
+        parses files in parallel but requires the constraint to be
+        picklable.
+
+        catalog (optional): True, or a cube_helper.catalog.Catalog, to
+        keep an on-disk metadata index of the directory. The index
+        orders the files without opening them, and files that are new
+        or have changed are indexed from the cubes loaded from them,
+        so each file is still read only once.
+
+        filename_dates (optional): True to read each file's time range
+        from its CMIP/DRS style name, or a regular expression (or list
+        of them) as accepted by parse_filename_dates(). Files are then
+        sorted and pruned by name, and only files whose names don't
+        match are opened to find their time range.
+
+        sort (optional): 'origin' (the default) orders the cubes by the
+        origin of their time units, 'time' orders them by their first
+        time point, which also handles files sharing one time origin.
+
+        recursive (optional): if True, also load files from nested
+        subdirectories. Paths are streamed into the loading pipeline as
+        the directory tree is walked.
+
+        include (optional): glob pattern(s) that file paths relative to
+        directory must match, e.g. '*/Amon/tas/*'.
+
+        exclude (optional): glob pattern(s) for relative paths of files
+        to skip and subdirectories not to enter.
+
+        max_depth (optional): the deepest subdirectory level to search
+        when recursive, None for no limit.
 
     Returns:
         iris.cube.CubeList(loaded_cubes), a CubeList of the loaded
         Cubes.
     """
-    if constraint is None:
-        loaded_cubes = []
-        cube_files = []
-        directory = _parse_directory(directory)
-        cube_paths = glob.glob(directory + '*' + filetype)
-        for path in cube_paths:
-            try:
-                loaded_cubes.append(iris.load_cube(path))
-                cube_files.append(path)
-            except (MergeError, ConstraintMismatchError):
-                for cube in iris.load_raw(path):
-                    if isinstance(cube.standard_name, str):
-                        loaded_cubes.append(cube)
-                        cube_files.append(path)
-        loaded_cubes.sort(key=sort_by_earliest_date)
-        cube_files.sort(key=file_sort_by_earliest_date)
-        return loaded_cubes, cube_files
-    else:
-        loaded_cubes = []
-        cube_files = []
-        directory = _parse_directory(directory)
-        cube_paths = glob.glob(directory + '*' + filetype)
-        if not _constraint_compatible(constraint,
-                                      iris.load_cube(cube_paths[0])):
-            constraint = _fix_partial_datetime(constraint)
-        for path in cube_paths:
-            try:
-                loaded_cubes.append(iris.load_cube(path, constraint))
-                cube_files.append(path)
-            except (MergeError, ConstraintMismatchError):
-                for cube in iris.load_raw(path, constraint):
-                    if isinstance(cube.standard_name, str):
-                        loaded_cubes.append(cube)
-                        cube_files.append(path)
-        loaded_cubes.sort(key=sort_by_earliest_date)
-        cube_files.sort(key=file_sort_by_earliest_date)
-        return loaded_cubes, cube_files
+    cube_paths, constraint, preloaded = _dir_paths(
+        directory, filetype, constraint, catalog, filename_dates,
+        recursive, include, exclude, max_depth, workers, executor)
+    return _load_paths(cube_paths, constraint, workers, executor, sort,
+                       preloaded)
 
 
-def load_from_filelist(paths, filetype, constraint=None):
+def load_from_filelist(paths, filetype, constraint=None, workers=None,
+                       executor='thread', filename_dates=None,
+                       sort='origin'):
     """
     Loads the specified files. Individual files are
     returned in a
@@ -258,42 +1584,33 @@ def load_from_filelist(paths, filetype, constraint=None):
 
         constraint (optional): a string, iterable of strings or an
         iris.Constraint specifying any constraints you wish to load
-        the dataset with.
+        the dataset with. Files whose time span cannot match a time
+        constraint are skipped without being loaded.
+
+        workers (optional): the number of files to load concurrently.
+        None (the default) loads the files one after another.
+
+        executor (optional): 'thread' (the default) or 'process', the
+        type of pool used when workers is set. The netCDF library is not
+        thread-safe, so threads never read netCDF files at the same time
+        and only overlap the rest of the work. The process backend
+        parses files in parallel but requires the constraint to be
+        picklable.
+
+        filename_dates (optional): True to read each file's time range
+        from its CMIP/DRS style name, or a regular expression (or list
+        of them) as accepted by parse_filename_dates(). Files are then
+        sorted and pruned by name, and only files whose names don't
+        match are opened to find their time range.
+
+        sort (optional): 'origin' (the default) orders the cubes by the
+        origin of their time units, 'time' orders them by their first
+        time point, which also handles files sharing one time origin.
 
     Returns:
         iris.cube.CubeList(loaded_cubes), a CubeList of the loaded
         Cubes.
     """
-    loaded_cubes = []
-    cube_files = []
-    for filename in paths:
-        if not filename.endswith(filetype):
-            paths.remove(filename)
-
-    for filename in paths:
-        if constraint is None:
-            try:
-                loaded_cubes.append(iris.load_cube(filename))
-                cube_files.append(filename)
-            except (MergeError, ConstraintMismatchError):
-                for cube in iris.load_raw(filename):
-                    if isinstance(cube.standard_name, str):
-                        loaded_cubes.append(cube)
-                        cube_files.append(filename)
-
-        else:
-            if not _constraint_compatible(constraint,
-                                          iris.load_cube(paths[0])):
-                constraint = _fix_partial_datetime(constraint)
-            try:
-                loaded_cubes.append(iris.load_cube(filename, constraint))
-                cube_files.append(filename)
-            except (MergeError, ConstraintMismatchError):
-                for cube in iris.load_raw(filename, constraint):
-                    if isinstance(cube.standard_name, str):
-                        loaded_cubes.append(iris.load_raw(filename,
-                                                          constraint))
-                        cube_files.append(filename)
-    loaded_cubes.sort(key=sort_by_earliest_date)
-    cube_files.sort(key=file_sort_by_earliest_date)
-    return loaded_cubes, cube_files
+    paths, constraint = _filelist_paths(paths, filetype, constraint,
+                                        filename_dates)
+    return _load_paths(paths, constraint, workers, executor, sort)
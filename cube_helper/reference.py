@@ -0,0 +1,442 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+"""
+Virtual-dataset references to concatenated cubes.
+
+A reference is a JSON file recording the metadata and coordinates of a
+cube returned by cube_help.load() together with, for each run of time
+slices, the source file, variable and time offsets the data comes from.
+Loading a reference rebuilds the lazy concatenated cube directly from the
+source variables, without parsing the source headers or equalising the
+cubes again.
+"""
+import json
+import os
+
+import cf_units
+import cftime
+import dask.array as da
+import iris.aux_factory
+import iris.coord_systems
+import iris.coords
+import iris.cube
+import numpy as np
+from six import string_types
+
+from cube_helper.cube_equaliser import (_coord_contents,
+                                        _coord_from_contents,
+                                        _json_default,
+                                        _json_object,
+                                        _same_time)
+from cube_helper.cube_loader import (_FILE_POOL,
+                                     _find_time_variable,
+                                     iter_files)
+
+REFERENCE_VERSION = 2
+
+
+class _SourceProxy(object):
+    """
+    A lazy, picklable view of time slices [start, stop) of a netCDF
+    variable, read through the file pool only when data is needed.
+    """
+    def __init__(self, path, var_name, time_dim, start, stop, shape, dtype):
+        self.path = path
+        self.var_name = var_name
+        self.time_dim = time_dim
+        self.start = start
+        self.stop = stop
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __getitem__(self, keys):
+        if not isinstance(keys, tuple):
+            keys = (keys,)
+        keys = keys + (slice(None),) * (self.ndim - len(keys))
+        time_keys = np.arange(self.start, self.stop)[keys[self.time_dim]]
+        file_keys = list(keys)
+        if np.ndim(time_keys) == 0:
+            file_keys[self.time_dim] = int(time_keys)
+        else:
+            low = int(time_keys.min()) if time_keys.size else self.start
+            high = int(time_keys.max()) + 1 if time_keys.size else self.start
+            file_keys[self.time_dim] = slice(low, high)
+        with _FILE_POOL.dataset(self.path) as dataset:
+            data = dataset.variables[self.var_name][tuple(file_keys)]
+        if np.ndim(time_keys) != 0 and time_keys.size:
+            # Leading integer keys drop their dimensions before time.
+            axis = sum(1 for key in keys[:self.time_dim]
+                       if not isinstance(key, slice))
+            data = np.take(data, time_keys - low, axis=axis)
+        return data.astype(self.dtype, copy=False)
+
+
+def _time_dim(cube):
+    """
+    Returns the time coordinate of a cube and the dimension it describes.
+    """
+    for coord in cube.coords(dim_coords=True):
+        if coord.units.is_time_reference():
+            return coord, cube.coord_dims(coord)[0]
+    raise ValueError("Cube has no time dimension coordinate")
+
+
+def _source_variable(dataset, cube):
+    """
+    Finds the variable in a source file that holds the data of cube.
+    """
+    variable = dataset.variables.get(cube.var_name)
+    if variable is not None:
+        return variable
+    for variable in dataset.variables.values():
+        if getattr(variable, 'standard_name', None) == cube.standard_name \
+                and variable.ndim == cube.ndim:
+            return variable
+    return None
+
+
+def _match_source(path, cube, time_coord, time_dim):
+    """
+    Pairs the time slices of a source file with positions in the time
+    dimension of cube.
+
+    Returns:
+        the name of the file's data variable and a list of
+        (cube index, file index) pairs, empty if the file holds none of
+        the cube's data.
+    """
+    with _FILE_POOL.dataset(path) as dataset:
+        variable = _source_variable(dataset, cube)
+        file_time = _find_time_variable(dataset)
+        if variable is None or file_time is None:
+            return None, []
+        shape = list(variable.shape)
+        del shape[time_dim]
+        cube_shape = list(cube.shape)
+        del cube_shape[time_dim]
+        if shape != cube_shape:
+            raise ValueError("Shape of {} in {} does not match the cube, "
+                             "only time may be subset".format(variable.name,
+                                                              path))
+        dates = cftime.num2date(np.ma.getdata(file_time[:]), file_time.units,
+                                getattr(file_time, 'calendar', 'standard'))
+        var_name = variable.name
+    values = time_coord.units.date2num(dates)
+    points = time_coord.points
+    positions = np.clip(np.searchsorted(points, values), 0, len(points) - 1)
+    nearest = np.where(
+        np.abs(points[positions - 1] - values) <
+        np.abs(points[positions] - values), positions - 1, positions)
+    nearest = np.where(positions == 0, 0, nearest)
+    matched = _same_time(points[nearest], values)
+    return var_name, [(int(cube_index), int(file_index))
+                      for file_index, cube_index in enumerate(nearest)
+                      if matched[file_index]]
+
+
+def _segments(cube, paths):
+    """
+    Builds the list of source runs making up the time dimension of cube.
+    """
+    time_coord, time_dim = _time_dim(cube)
+    pairs = []
+    for path in paths:
+        var_name, matches = _match_source(path, cube, time_coord, time_dim)
+        pairs.extend((cube_index, path, var_name, file_index)
+                     for cube_index, file_index in matches)
+    pairs.sort(key=lambda pair: pair[0])
+    if [pair[0] for pair in pairs] != list(range(cube.shape[time_dim])):
+        raise ValueError("Source files do not cover each time of the cube "
+                         "exactly once")
+    segments = []
+    for _, path, var_name, file_index in pairs:
+        if segments and segments[-1]['path'] == path and \
+                segments[-1]['stop'] == file_index:
+            segments[-1]['stop'] += 1
+        else:
+            stat = os.stat(path)
+            segments.append({'path': os.path.abspath(path),
+                             'var_name': var_name,
+                             'start': file_index,
+                             'stop': file_index + 1,
+                             'size': stat.st_size,
+                             'mtime': stat.st_mtime})
+    return time_dim, segments
+
+
+def save_reference(cube, sources, filename, filetype='.nc'):
+    """
+    Exports a reference file describing a concatenated cube, so that
+    load_reference() can rebuild it without re-reading the source headers
+    or re-running equalisation.
+
+    Args:
+        cube: the concatenated Cube, as returned by cube_help.load().
+
+        sources: the directory, or list of filenames, the cube was
+        loaded from.
+
+        filename: the reference file to write.
+
+        filetype (optional): extension of the source files when sources
+        is a directory, '.nc' by default.
+
+    Returns:
+        filename.
+    """
+    if isinstance(sources, string_types):
+        sources = iter_files(sources, filetype)
+    time_dim, segments = _segments(cube, sorted(sources))
+    contents = {'version': REFERENCE_VERSION,
+                'cube': _template(cube),
+                'time_dim': time_dim,
+                'segments': segments}
+    return _write_reference(contents, filename)
+
+
+def extend_reference(filename, cube, sources):
+    """
+    Updates a reference file after the cube it describes has been
+    extended along time, matching only the new source files rather than
+    every source of the cube again.
+
+    Args:
+        filename: the reference file to update, written by
+        save_reference().
+
+        cube: the extended Cube, whose leading times are those of the
+        cube already described by filename.
+
+        sources: the list of new source files the extra times of cube
+        were loaded from.
+
+    Returns:
+        filename.
+    """
+    contents = _read_reference(filename)
+    time_dim = contents['time_dim']
+    keys = [slice(None)] * cube.ndim
+    keys[time_dim] = slice(contents['cube']['shape'][time_dim], None)
+    _, segments = _segments(cube[tuple(keys)], sorted(sources))
+    contents['cube'] = _template(cube)
+    contents['segments'].extend(segments)
+    return _write_reference(contents, filename)
+
+
+def _coord_system_contents(coord_system):
+    """
+    Returns the state of an iris coordinate system, including any nested
+    ellipsoid, as JSON-ready contents.
+    """
+    if coord_system is None:
+        return None
+    state = {}
+    for key, value in vars(coord_system).items():
+        if isinstance(value, iris.coord_systems.CoordSystem):
+            value = _coord_system_contents(value)
+        state[key] = value
+    return {'__coord_system__': type(coord_system).__name__,
+            'state': state}
+
+
+def _coord_system_from_contents(contents):
+    if contents is None:
+        return None
+    cls = getattr(iris.coord_systems, contents['__coord_system__'])
+    coord_system = cls.__new__(cls)
+    for key, value in contents['state'].items():
+        if isinstance(value, dict) and '__coord_system__' in value:
+            value = _coord_system_from_contents(value)
+        setattr(coord_system, key, value)
+    return coord_system
+
+
+def _variable_contents(variable, dims):
+    """
+    Returns the names, units, attributes and values of a cell measure or
+    ancillary variable, and the cube dimensions it spans.
+    """
+    return {'standard_name': variable.standard_name,
+            'long_name': variable.long_name,
+            'var_name': variable.var_name,
+            'units': str(variable.units),
+            'calendar': variable.units.calendar,
+            'attributes': dict(variable.attributes),
+            'measure': getattr(variable, 'measure', None),
+            'data': variable.data,
+            'dims': list(dims)}
+
+
+def _variable_from_contents(cls, contents):
+    kwargs = {'standard_name': contents['standard_name'],
+              'long_name': contents['long_name'],
+              'var_name': contents['var_name'],
+              'units': cf_units.Unit(contents['units'],
+                                     contents['calendar']),
+              'attributes': contents['attributes']}
+    if contents['measure'] is not None:
+        kwargs['measure'] = contents['measure']
+    return cls(contents['data'], **kwargs)
+
+
+def _template(cube):
+    """
+    Returns the metadata, coordinates and other variables of cube as the
+    JSON-ready contents of a reference file.
+    """
+    # Derived coords are left out, their factories rebuild them.
+    coords = list(cube.dim_coords) + list(cube.aux_coords)
+    entries = []
+    for index, coord in enumerate(coords):
+        entry = _coord_contents(coord)
+        entry.update(dims=list(cube.coord_dims(coord)),
+                     dim_coord=index < len(cube.dim_coords),
+                     circular=getattr(coord, 'circular', False),
+                     climatological=getattr(coord, 'climatological', False),
+                     coord_system=_coord_system_contents(
+                         coord.coord_system))
+        entries.append(entry)
+    factories = []
+    for factory in cube.aux_factories:
+        # Dependencies refer to coords by their position in the list.
+        dependencies = {}
+        for key, coord in factory.dependencies.items():
+            dependencies[key] = None if coord is None else next(
+                index for index, other in enumerate(coords)
+                if other is coord)
+        factories.append({'type': type(factory).__name__,
+                          'dependencies': dependencies})
+    ancillary_variables = getattr(cube, 'ancillary_variables', list)()
+    return {'standard_name': cube.standard_name,
+            'long_name': cube.long_name,
+            'var_name': cube.var_name,
+            'units': str(cube.units),
+            'calendar': cube.units.calendar,
+            'attributes': dict(cube.attributes),
+            'cell_methods': [[method.method, list(method.coord_names),
+                              list(method.intervals), list(method.comments)]
+                             for method in cube.cell_methods],
+            'dtype': np.dtype(cube.dtype).str,
+            'shape': list(cube.shape),
+            'coords': entries,
+            'aux_factories': factories,
+            'cell_measures': [
+                _variable_contents(measure, cube.cell_measure_dims(measure))
+                for measure in cube.cell_measures()],
+            'ancillary_variables': [
+                _variable_contents(variable,
+                                   cube.ancillary_variable_dims(variable))
+                for variable in ancillary_variables]}
+
+
+def _cube_from_template(template, data):
+    """
+    Builds a cube with the metadata and coordinates recorded by
+    _template() around data.
+    """
+    cube = iris.cube.Cube(
+        data,
+        standard_name=template['standard_name'],
+        long_name=template['long_name'],
+        var_name=template['var_name'],
+        units=cf_units.Unit(template['units'], template['calendar']),
+        attributes=template['attributes'],
+        cell_methods=tuple(iris.coords.CellMethod(*method)
+                           for method in template['cell_methods']))
+    coords = []
+    for entry in template['coords']:
+        coord = _coord_from_contents(entry)
+        coord.coord_system = _coord_system_from_contents(
+            entry['coord_system'])
+        if entry['climatological']:
+            coord.climatological = True
+        if entry['dim_coord']:
+            coord = iris.coords.DimCoord.from_coord(coord)
+            coord.circular = entry['circular']
+            cube.add_dim_coord(coord, entry['dims'][0])
+        else:
+            cube.add_aux_coord(coord, entry['dims'])
+        coords.append(coord)
+    for factory in template['aux_factories']:
+        cls = getattr(iris.aux_factory, factory['type'])
+        cube.add_aux_factory(cls(**{
+            key: None if index is None else coords[index]
+            for key, index in factory['dependencies'].items()}))
+    for entry in template['cell_measures']:
+        cube.add_cell_measure(
+            _variable_from_contents(iris.coords.CellMeasure, entry),
+            entry['dims'])
+    for entry in template['ancillary_variables']:
+        cube.add_ancillary_variable(
+            _variable_from_contents(iris.coords.AncillaryVariable, entry),
+            entry['dims'])
+    return cube
+
+
+def _write_reference(contents, filename):
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as fh:
+        json.dump(contents, fh, default=_json_default)
+    os.replace(tmp_filename, filename)
+    return filename
+
+
+def load_reference(filename, check=True):
+    """
+    Rebuilds the lazy concatenated cube described by a reference file.
+
+    Args:
+        filename: a reference file written by save_reference().
+
+        check (optional): whether to check that the source files have not
+        changed since the reference was written, True by default.
+
+    Returns:
+        the concatenated Cube, with lazy data read from the source files.
+    """
+    return _rebuild_reference(_read_reference(filename), check)
+
+
+def _read_reference(filename):
+    with open(filename) as fh:
+        contents = json.load(fh, object_hook=_json_object)
+    if contents.get('version') != REFERENCE_VERSION:
+        raise ValueError("Unsupported reference file version "
+                         "{}".format(contents.get('version')))
+    return contents
+
+
+def _rebuild_reference(contents, check=True):
+    """
+    Builds the lazy concatenated cube described by the contents of a
+    reference file.
+    """
+    template = contents['cube']
+    dtype = np.dtype(template['dtype'])
+    time_dim = contents['time_dim']
+    parts = []
+    for segment in contents['segments']:
+        if check:
+            stat = os.stat(segment['path'])
+            if (stat.st_size, stat.st_mtime) != (segment['size'],
+                                                 segment['mtime']):
+                raise ValueError("{} has changed since the reference was "
+                                 "written".format(segment['path']))
+        shape = list(template['shape'])
+        shape[time_dim] = segment['stop'] - segment['start']
+        proxy = _SourceProxy(segment['path'], segment['var_name'], time_dim,
+                             segment['start'], segment['stop'], tuple(shape),
+                             dtype)
+        # asarray=False keeps the masks of the source data. No meta is
+        # passed, as older dask releases do not accept one.
+        parts.append(da.from_array(proxy, chunks=proxy.shape,
+                                   asarray=False, name=False))
+    return _cube_from_template(template,
+                               da.concatenate(parts, axis=time_dim))
@@ -0,0 +1,169 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+"""
+An opt-in on-disk cache of the cubes returned by cube_help.load().
+
+Entries are keyed by the sorted list of source files with their sizes and
+modification times, the constraint and the filetype, so editing, adding
+or removing any source file gives a new key. The equalised, concatenated
+cube is pickled with its data left lazy, so an entry only holds the
+cube's metadata and coordinates plus a reference to the source files.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+CACHE_SUFFIX = '.cube.pkl'
+
+
+def _constraint_token(constraints):
+    """
+    Returns a string identifying constraints, or None if they can't be
+    identified reliably across calls (e.g. they contain a lambda, whose
+    repr is only its memory address).
+    """
+    token = repr(constraints)
+    if ' at 0x' in token:
+        return None
+    return token
+
+
+class ResultCache(object):
+    """
+    A size-bounded directory of cached load() results, evicting the least
+    recently used entries first.
+
+    Args:
+        directory: the directory to keep cached results in. It is created
+        if needed.
+
+        max_bytes (optional): the maximum total size of the cached
+        results, 1 GiB by default.
+    """
+    def __init__(self, directory, max_bytes=2 ** 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, paths, constraints=None, filetype='.nc'):
+        """
+        Builds the cache key for a load.
+
+        Args:
+            paths: the source files of the load.
+
+            constraints (optional): the constraints of the load.
+
+            filetype (optional): the filetype of the load.
+
+        Returns:
+            a hex digest string, or None if the load cannot be cached.
+        """
+        token = _constraint_token(constraints)
+        if token is None:
+            return None
+        fingerprint = []
+        for path in sorted(paths):
+            stat = os.stat(path)
+            fingerprint.append([os.path.abspath(path), stat.st_size,
+                                stat.st_mtime])
+        contents = json.dumps([fingerprint, token, filetype])
+        return hashlib.sha256(contents.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        Returns the cached cube for key, or None on a cache miss.
+        """
+        if key is None:
+            return None
+        path = self._path(key)
+        try:
+            fh = open(path, 'rb')
+        except (IOError, OSError):
+            return None
+        try:
+            with fh:
+                cube = pickle.load(fh)
+        except Exception:
+            # Truncated entries, or ones written against other versions
+            # of iris, can fail to unpickle in many ways; they are
+            # dropped so that the load is cached afresh.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            # Another process evicted the entry after it was read.
+            pass
+        return cube
+
+    def put(self, key, cube):
+        """
+        Stores cube under key, then evicts the least recently used entries
+        until the cache fits in max_bytes.
+        """
+        if key is None:
+            return
+        path = self._path(key)
+        # A unique temporary file, so processes storing the same key do
+        # not write over each other's partial entries.
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix='.tmp',
+                                         delete=False) as fh:
+            try:
+                pickle.dump(cube, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                fh.close()
+                os.remove(fh.name)
+                raise
+        os.replace(fh.name, path)
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def invalidate(self, key=None):
+        """
+        Removes the entry for key, or every entry if key is None.
+        """
+        if key is not None:
+            paths = [self._path(key)]
+        else:
+            paths = [path for _, _, path in self._entries()]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
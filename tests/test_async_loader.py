@@ -0,0 +1,104 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+import os
+import shutil
+import threading
+import unittest
+from unittest import mock
+import iris
+import iris.cube
+from iris.tests import stock
+import cf_units
+import cube_helper as ch
+from cube_helper.cube_loader import load_from_dir
+
+
+class TestAsyncLoader(unittest.TestCase):
+
+    def setUp(self):
+        super(TestAsyncLoader, self).setUp()
+        abs_path = os.path.dirname(os.path.abspath(__file__))
+        self.tmp_dir_async = abs_path + '/' + 'tmp_dir_async/'
+        if not os.path.exists(self.tmp_dir_async):
+            os.mkdir(self.tmp_dir_async)
+        base_cube = stock.realistic_3d()
+        cube_1 = base_cube[0:2]
+        cube_2 = base_cube[2:4]
+        cube_3 = base_cube[4:]
+        new_time = cf_units.Unit('hours since 1980-01-01 00:00:00',
+                                 'gregorian')
+        cube_2.dim_coords[0].convert_units(new_time)
+        iris.save(cube_1, self.tmp_dir_async + 'temp_1.nc')
+        iris.save(cube_2, self.tmp_dir_async + 'temp_2.nc')
+        iris.save(cube_3, self.tmp_dir_async + 'temp_3.nc')
+        self.loop = asyncio.new_event_loop()
+
+    def test_aload_from_dir(self):
+        test_load, test_names = self.loop.run_until_complete(
+            ch.aload_from_dir(self.tmp_dir_async, '.nc', concurrency=2))
+        serial_load, serial_names = load_from_dir(self.tmp_dir_async, '.nc')
+        self.assertEqual(test_names, serial_names)
+        for cube_a, cube_b in zip(test_load, serial_load):
+            self.assertEqual(cube_a.coord('time'), cube_b.coord('time'))
+
+    def test_aload_from_filelist(self):
+        filelist = glob(self.tmp_dir_async + '*.nc')
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            test_load, test_names = self.loop.run_until_complete(
+                ch.aload_from_filelist(filelist, '.nc', executor=executor))
+        self.assertEqual(len(test_load), 3)
+        self.assertEqual(sorted(test_names), sorted(filelist))
+
+    def test_aload_bounded(self):
+        filelist = sorted(glob(self.tmp_dir_async + '*.nc')) * 10
+        with mock.patch('asyncio.ensure_future',
+                        wraps=asyncio.ensure_future) as ensure_future:
+            test_load, test_names = self.loop.run_until_complete(
+                ch.aload_from_filelist(filelist, '.nc', concurrency=2))
+            self.assertEqual(ensure_future.call_count, 2)
+        self.assertEqual(len(test_load), 30)
+        self.assertEqual(sorted(test_names), sorted(filelist))
+
+    def test_aload(self):
+        result = self.loop.run_until_complete(ch.aload(self.tmp_dir_async))
+        self.assertIsInstance(result, iris.cube.Cube)
+        self.assertEqual(result.coord('time').shape, (7,))
+
+    def test_aload_cancel(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_load(path, constraint=None):
+            started.set()
+            release.wait(5)
+            return []
+
+        async def cancel_load():
+            task = asyncio.ensure_future(
+                ch.aload_from_dir(self.tmp_dir_async, '.nc', concurrency=1))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            finally:
+                release.set()
+
+        with mock.patch('cube_helper.async_loader._load_path', slow_load):
+            self.assertRaises(asyncio.CancelledError,
+                              self.loop.run_until_complete, cancel_load())
+
+    def tearDown(self):
+        super(TestAsyncLoader, self).tearDown()
+        self.loop.close()
+        shutil.rmtree(self.tmp_dir_async)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+import os
+import shutil
+import unittest
+from unittest import mock
+import iris
+from iris.tests import stock
+import cf_units
+from cube_helper.catalog import Catalog, build_catalog, CATALOG_FILENAME
+from cube_helper.cube_loader import load_from_dir, _sort_paths
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        super(TestCatalog, self).setUp()
+        abs_path = os.path.dirname(os.path.abspath(__file__))
+        self.tmp_dir_catalog = abs_path + '/' + 'tmp_dir_catalog/'
+        if not os.path.exists(self.tmp_dir_catalog):
+            os.mkdir(self.tmp_dir_catalog)
+        base_cube = stock.realistic_3d()
+        cube_1 = base_cube[0:2]
+        cube_2 = base_cube[2:4]
+        cube_3 = base_cube[4:]
+        new_time = cf_units.Unit('hours since 1980-01-01 00:00:00',
+                                 'gregorian')
+        cube_2.dim_coords[0].convert_units(new_time)
+        new_time = cf_units.Unit('hours since 1990-01-01 00:00:00',
+                                 'gregorian')
+        cube_3.dim_coords[0].convert_units(new_time)
+        # Saved in reverse order of their names, so a name sort would
+        # order them incorrectly.
+        self.filenames = ['c.nc', 'b.nc', 'a.nc']
+        for cube, name in zip([cube_1, cube_2, cube_3], self.filenames):
+            iris.save(cube, self.tmp_dir_catalog + name)
+
+    def test_build_catalog(self):
+        catalog = build_catalog(self.tmp_dir_catalog)
+        self.assertTrue(os.path.exists(self.tmp_dir_catalog +
+                                       CATALOG_FILENAME))
+        self.assertEqual(len(catalog.entries), 3)
+        entry = catalog.entries[self.tmp_dir_catalog + 'c.nc']
+        cube_entry = entry['cubes'][0]
+        self.assertEqual(cube_entry['standard_name'],
+                         'air_potential_temperature')
+        self.assertEqual(cube_entry['shape'], [2, 9, 11])
+        self.assertEqual(cube_entry['time_units'],
+                         'hours since 1970-01-01 00:00:00')
+
+    def test_sort_paths(self):
+        catalog = build_catalog(self.tmp_dir_catalog)
+        paths = sorted(catalog.entries)
+        self.assertEqual(_sort_paths(paths, catalog),
+                         [self.tmp_dir_catalog + name
+                          for name in self.filenames])
+
+    def test_update_only_reads_changed_files(self):
+        build_catalog(self.tmp_dir_catalog)
+        catalog = Catalog(self.tmp_dir_catalog)
+        self.assertEqual(len(catalog.entries), 3)
+        paths = sorted(catalog.entries)
+        with mock.patch('iris.load_raw') as load_raw:
+            catalog.update(paths)
+            self.assertFalse(load_raw.called)
+        os.remove(paths[0])
+        catalog.update(paths[1:2])
+        self.assertNotIn(paths[0], catalog.entries)
+        self.assertIn(paths[2], catalog.entries)
+
+    def test_load_from_dir_catalog(self):
+        test_load, test_names = load_from_dir(self.tmp_dir_catalog, '.nc',
+                                              catalog=True)
+        self.assertEqual(test_names, [self.tmp_dir_catalog + name
+                                      for name in self.filenames])
+        self.assertEqual(len(test_load), 3)
+
+    def test_load_from_dir_indexes_loaded_cubes(self):
+        with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw, \
+                mock.patch('cube_helper.cube_loader._read_time_span') as span:
+            test_load, test_names = load_from_dir(self.tmp_dir_catalog,
+                                                  '.nc', catalog=True)
+            self.assertEqual(load_raw.call_count, 3)
+            self.assertFalse(span.called)
+        self.assertEqual(test_names, [self.tmp_dir_catalog + name
+                                      for name in self.filenames])
+        catalog = Catalog(os.path.relpath(self.tmp_dir_catalog) + '/')
+        self.assertEqual(sorted(catalog.entries),
+                         [self.tmp_dir_catalog + name
+                          for name in sorted(self.filenames)])
+        self.assertTrue(all(catalog.is_current(path)
+                            for path in catalog.entries))
+
+    def tearDown(self):
+        super(TestCatalog, self).tearDown()
+        shutil.rmtree(self.tmp_dir_catalog)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,18 @@
 # BSD 3-Clause license.
 # See LICENSE in the root of the repository for full licensing details.
 import cube_helper as ch
+from cube_helper.cube_equaliser import _cube_fingerprint
 from common import _generate_ocean_cube, _redirect_stdout
 import unittest
+from unittest import mock
 import cf_units
+import numpy as np
+import dask.array as da
 from glob import glob
 import os
 import iris
 import iris.coords
+import iris.util
 from iris.tests import stock
 import platform
 if float(platform.python_version()[0:3]) <= 2.7:
@@ -98,6 +103,22 @@ class TestCubeEqualiser(unittest.TestCase):
         for cubes in test_load:
             self.assertEqual(cubes.attributes, test_load[0].attributes)
 
+    def test_equalise_attributes_arrays(self):
+        base_cube = stock.realistic_3d()
+        test_cubes = [base_cube[i:i + 1] for i in range(4)]
+        for cube in test_cubes:
+            cube.attributes['valid_range'] = np.arange(2000.)
+            cube.attributes['flags'] = np.array([1, 2, 3])
+            cube.attributes['common'] = 'same'
+        # Arrays whose printed forms are identical but contents differ.
+        test_cubes[2].attributes['valid_range'] = np.arange(2000.)
+        test_cubes[2].attributes['valid_range'][1000] = -1
+        test_cubes[3].attributes['only_here'] = 1
+        ch.equalise_attributes(test_cubes)
+        for cube in test_cubes:
+            self.assertEqual(sorted(cube.attributes),
+                             ['common', 'flags', 'source'])
+
     def test_equalise_time_units(self):
         glob_path = self.tmp_dir_time + '*.nc'
         filepaths = glob(glob_path)
@@ -113,6 +134,34 @@ class TestCubeEqualiser(unittest.TestCase):
                     self.assertEqual(test_origin,
                                      time_coords.units.origin)
 
+    def test_equalise_time_units_single_pass(self):
+        glob_path = self.tmp_dir_time + '*.nc'
+        filepaths = sorted(glob(glob_path))
+        test_load = [iris.load_cube(cube) for cube in filepaths]
+        for cube in test_load:
+            cube.coord('time').guess_bounds()
+            lazy_time = iris.coords.AuxCoord(
+                cube.coord('time').lazy_points(), long_name='valid_time',
+                units=cube.coord('time').units)
+            cube.add_aux_coord(lazy_time, 0)
+        expected = [cube.copy() for cube in test_load]
+        iris.util.unify_time_units(expected)
+        with mock.patch('iris.coords.Coord.convert_units') as convert:
+            ch.equalise_time_units(test_load)
+            self.assertFalse(convert.called)
+        for cube, expected_cube in zip(test_load, expected):
+            self.assertTrue(cube.coord('valid_time').has_lazy_points())
+            for name in ['time', 'valid_time']:
+                coord = cube.coord(name)
+                expected_coord = expected_cube.coord(name)
+                self.assertEqual(coord.units, expected_coord.units)
+                self.assertEqual(coord.dtype, expected_coord.dtype)
+                np.testing.assert_allclose(coord.points,
+                                           expected_coord.points)
+                if coord.has_bounds():
+                    np.testing.assert_allclose(coord.bounds,
+                                               expected_coord.bounds)
+
     def test_remove_attributes(self):
         glob_path = self.tmp_dir + '*.nc'
         filepaths = glob(glob_path)
@@ -140,6 +189,26 @@ class TestCubeEqualiser(unittest.TestCase):
         for cube in test_load:
             self.assertEqual(cube.dtype, 'int64')
 
+    def test_equalise_data_type_lazy(self):
+        glob_path = self.tmp_dir + '*.nc'
+        filepaths = glob(glob_path)
+        test_load = [iris.load_cube(cube) for cube in filepaths]
+        for cube in test_load:
+            # Small variables are loaded eagerly, so make them lazy.
+            cube.data = cube.lazy_data()
+        ch.equalise_data_type(test_load, np.float16)
+        for cube in test_load:
+            self.assertTrue(cube.has_lazy_data())
+            self.assertEqual(cube.dtype, np.float16)
+        lazy_data = test_load[0].lazy_data()
+        ch.equalise_data_type(test_load, 'float16')
+        self.assertIs(test_load[0].lazy_data(), lazy_data)
+        self.assertEqual(test_load[0].data.dtype, np.float16)
+        out = IO()
+        with _redirect_stdout(out):
+            ch.equalise_data_type(test_load, 'bananas')
+        self.assertEqual(out.getvalue().strip(), "invalid data type")
+
     def test_equalise_dim_coords(self):
         glob_path = self.tmp_dir + '*.nc'
         filepaths = glob(glob_path)
@@ -169,6 +238,28 @@ class TestCubeEqualiser(unittest.TestCase):
             coords_list = [c.name() for c in cube.coords()]
             self.assertIn('height', coords_list)
 
+    def test_equalise_aux_coords_single_donor(self):
+        base_cube = stock.realistic_3d()
+        test_cubes = [base_cube[i:i + 1] for i in range(7)]
+        height_coord = iris.coords.AuxCoord(2, standard_name='height',
+                                            units='m')
+        test_cubes[3].add_aux_coord(height_coord)
+        test_cubes[5].add_aux_coord(height_coord * 5)
+        test_cubes[6].remove_coord('forecast_period')
+        ch.equalise_aux_coords(test_cubes)
+        for i, cube in enumerate(test_cubes):
+            if i == 5:
+                self.assertEqual(cube.coord('height').points, [10])
+            else:
+                self.assertEqual(cube.coord('height'), height_coord)
+        self.assertIsNot(test_cubes[0].coord('height'),
+                         test_cubes[1].coord('height'))
+        out = IO()
+        with _redirect_stdout(out):
+            ch.equalise_aux_coords(test_cubes, comp_only=True)
+        self.assertEqual(out.getvalue().strip(),
+                         "forecast_period coords inconsistent")
+
     def test_compare_cubes(self):
         glob_path = self.tmp_dir_aux + '*.nc'
         filepaths = glob(glob_path)
@@ -181,6 +272,32 @@ class TestCubeEqualiser(unittest.TestCase):
                           "\n\n\theight coords inconsistent"
         self.assertEqual(output, expected_output)
 
+    def test_compare_cubes_fingerprints(self):
+        base_cube = stock.realistic_3d()
+        test_cubes = [base_cube.copy() for _ in range(50)]
+        fingerprints = {_cube_fingerprint(cube) for cube in test_cubes}
+        self.assertEqual(len(fingerprints), 1)
+        test_cubes[20].attributes['history'] = 'a differing attribute'
+        fingerprint = _cube_fingerprint(test_cubes[20])
+        self.assertNotIn(fingerprint, fingerprints)
+        self.assertEqual(fingerprint.aux_coords,
+                         list(fingerprints)[0].aux_coords)
+        out = IO()
+        with _redirect_stdout(out):
+            ch.compare_cubes(test_cubes)
+        output = out.getvalue().strip()
+        expected_output = "cube attributes differ: " + \
+                          "\n\n\thistory attributes inconsistent"
+        self.assertEqual(output, expected_output)
+
+    def test_fingerprint_keeps_coords_lazy(self):
+        cube = stock.realistic_3d()
+        cube.add_aux_coord(iris.coords.AuxCoord(da.arange(7.0, chunks=7),
+                                                long_name='lazy'), 0)
+        copy = cube.copy()
+        self.assertEqual(_cube_fingerprint(cube), _cube_fingerprint(copy))
+        self.assertTrue(cube.coord('lazy').has_lazy_points())
+
     def test_compare_cubes_incompatible(self):
         test_case_a = stock.simple_2d()
         test_case_b = stock.simple_3d()
@@ -208,6 +325,115 @@ class TestCubeEqualiser(unittest.TestCase):
         self.assertNotIn('history', test_attr)
         self.assertNotIn('tracking_id', test_attr)
 
+    def test_plan_equalisation(self):
+        base_cube = stock.realistic_3d()
+        test_cubes = [base_cube[i:i + 2] for i in range(0, 6, 2)]
+        test_cubes[1].attributes['history'] = 'a differing attribute'
+        test_cubes[1].add_aux_coord(iris.coords.AuxCoord(
+            2, standard_name='height', units='m'))
+        test_cubes[2].coord('grid_latitude').var_name = 'bananas'
+        test_cubes[2].coord('time').convert_units(cf_units.Unit(
+            'hours since 1980-01-01 00:00:00', 'gregorian'))
+        plan = ch.plan_equalisation(test_cubes)
+        self.assertEqual(plan.removed_attributes, ['history'])
+        self.assertEqual([index for index, _ in plan.added_coords], [0, 2])
+        self.assertEqual([(index, name) for index, name, _
+                          in plan.renamed_coords],
+                         [(0, 'grid_latitude'), (1, 'grid_latitude')])
+        out = IO()
+        with _redirect_stdout(out):
+            plan.compare()
+        output = out.getvalue()
+        self.assertIn("cube aux coordinates differ", output)
+        self.assertIn("height coords inconsistent", output)
+        self.assertIn("grid_latitude coords var_name inconsistent", output)
+        self.assertIn("history attributes inconsistent", output)
+        self.assertIn("time start date inconsistent", output)
+        expected = [cube.copy() for cube in test_cubes]
+        expected = ch.equalise_aux_coords(expected)
+        expected = ch.equalise_attributes(expected)
+        expected = ch.equalise_dim_coords(expected)
+        expected = ch.equalise_time_units(expected)
+        with _redirect_stdout(out):
+            test_cubes = plan.apply(test_cubes)
+        for cube, expected_cube in zip(test_cubes, expected):
+            self.assertEqual(cube.metadata, expected_cube.metadata)
+            self.assertEqual(cube.coords(), expected_cube.coords())
+        iris.cube.CubeList(test_cubes).concatenate_cube()
+
+    def test_save_plan(self):
+        base_cube = stock.realistic_3d()
+        members = []
+        for member in range(2):
+            test_cubes = [base_cube[i:i + 2].copy() for i in range(0, 6, 2)]
+            for cube in test_cubes:
+                cube.attributes['realization'] = member
+            test_cubes[1].attributes['history'] = 'member {}'.format(member)
+            test_cubes[0].add_aux_coord(iris.coords.AuxCoord(
+                member + 1, standard_name='height', units='m'))
+            test_cubes[2].coord('time').convert_units(cf_units.Unit(
+                'hours since 1980-01-01 00:00:00', 'gregorian'))
+            members.append(test_cubes)
+        plan = ch.plan_equalisation(members[0])
+        plan_file = self.tmp_dir + 'plan.json'
+        ch.save_plan(plan, plan_file)
+        try:
+            loaded = ch.load_plan(plan_file)
+        finally:
+            os.remove(plan_file)
+        self.assertEqual(loaded.fingerprint, plan.fingerprint)
+        self.assertEqual(loaded.removed_attributes, ['history'])
+        self.assertTrue(loaded.matches(members[1]))
+        with _redirect_stdout(IO()):
+            loaded.apply(members[1])
+        for cube in members[1]:
+            self.assertNotIn('history', cube.attributes)
+            self.assertEqual(cube.coord('height').points[0], 2)
+            self.assertEqual(cube.coord('time').units,
+                             base_cube.coord('time').units)
+        iris.cube.CubeList(members[1]).concatenate_cube()
+        self.assertFalse(loaded.matches(members[0][:2]))
+        members[0][0].attributes['realization'] = 5
+        self.assertFalse(loaded.matches(members[0]))
+
+    def test_examine_dim_bounds(self):
+        base_cube = stock.realistic_3d()
+        test_cubes = [base_cube[0:2], base_cube[4:6], base_cube[1:3],
+                      base_cube[4:6]]
+        cube_files = ['file_{}.nc'.format(i) for i in range(4)]
+        report = ch.examine_dim_bounds(test_cubes, cube_files)
+        self.assertEqual(report.overlaps, [(0, 2)])
+        self.assertEqual(report.duplicates, [(1, 3)])
+        self.assertEqual(report.gaps, [(1, 2)])
+        self.assertIn("overlap at cube 0 and cube 2", report.message)
+        self.assertIn("\n\tfile_1.nc\n\tfile_3.nc", report.message)
+        for cube in test_cubes:
+            cube.coord('time').guess_bounds()
+        report = ch.examine_dim_bounds(test_cubes, cube_files)
+        self.assertEqual(report.overlaps, [(0, 2)])
+        self.assertEqual(report.duplicates, [(1, 3)])
+        self.assertEqual(report.gaps, [(1, 2)])
+
+        def time_cube(points):
+            time = iris.coords.DimCoord(
+                np.array(points, dtype='float64'), standard_name='time',
+                units='hours since 1970-01-01 00:00:00')
+            return iris.cube.Cube(np.zeros(len(points)),
+                                  dim_coords_and_dims=[(time, 0)])
+
+        test_cubes = [time_cube([0, 5, 10]), time_cube([0, 5]),
+                      time_cube([0, 5, 10])]
+        report = ch.examine_dim_bounds(test_cubes, cube_files)
+        self.assertEqual(report.overlaps, [(0, 1), (1, 2)])
+        self.assertEqual(report.duplicates, [(0, 2)])
+        self.assertEqual(report.gaps, [])
+        test_cubes = [time_cube(range(11)), time_cube([1, 2, 3]),
+                      time_cube([2, 3, 4])]
+        report = ch.examine_dim_bounds(test_cubes, cube_files)
+        self.assertEqual(report.overlaps, [(0, 1), (0, 2), (1, 2)])
+        self.assertEqual(report.duplicates, [])
+        self.assertEqual(report.gaps, [])
+
     def tearDown(self):
         super(TestCubeEqualiser, self).tearDown()
         if os.path.exists(self.tmp_dir + self.temp_1):
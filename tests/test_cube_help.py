@@ -5,6 +5,7 @@
 # See LICENSE in the root of the repository for full licensing details.
 
 import unittest
+from unittest import mock
 from iris.tests import stock
 import iris
 import iris.cube
@@ -129,6 +130,98 @@ class TestCubeHelp(unittest.TestCase):
                          "gregorian")
         self.assertEqual(output, expected_output)
 
+    def test_load_many(self):
+        tmp_dir_many = self.tmp_dir_time + 'many/'
+        os.mkdir(tmp_dir_many)
+        filepaths = sorted(glob(self.tmp_dir_time + '*.nc'))
+        try:
+            for i, filepath in enumerate(filepaths):
+                cube_a = iris.load_cube(filepath)
+                cube_b = cube_a.copy()
+                cube_b.rename('air_temperature')
+                cube_b.var_name = 'air_temperature'
+                iris.save([cube_a, cube_b],
+                          tmp_dir_many + 'multi_{}.nc'.format(i))
+            constraints = {'theta': 'air_potential_temperature',
+                           'tas': iris.Constraint('air_temperature')}
+            with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw:
+                results = ch.load_many(tmp_dir_many, constraints)
+                self.assertEqual(load_raw.call_count, len(filepaths))
+            self.assertEqual(sorted(results), ['tas', 'theta'])
+            self.assertEqual(results['tas'].name(), 'air_temperature')
+            self.assertEqual(results['theta'].name(),
+                             'air_potential_temperature')
+            self.assertEqual(results['tas'].shape, results['theta'].shape)
+            parallel = ch.load_many(tmp_dir_many, constraints, workers=2)
+            self.assertEqual(parallel['tas'].shape, results['tas'].shape)
+            self.assertRaises(OSError, ch.load_many, tmp_dir_many,
+                              {'missing': 'bananas'})
+        finally:
+            for filepath in glob(tmp_dir_many + '*.nc'):
+                os.remove(filepath)
+            os.rmdir(tmp_dir_many)
+
+    def test_load_plan(self):
+        plan_file = self.tmp_dir_time + 'plan.json'
+        try:
+            out = IO()
+            with common._redirect_stdout(out):
+                test_case_a = ch.load(self.tmp_dir_time, plan=plan_file)
+            self.assertTrue(os.path.exists(plan_file))
+            out_b = IO()
+            with mock.patch('cube_helper.cube_help.plan_equalisation') \
+                    as plan_equalisation:
+                with common._redirect_stdout(out_b):
+                    test_case_b = ch.load(self.tmp_dir_time,
+                                          plan=plan_file)
+                self.assertFalse(plan_equalisation.called)
+            self.assertIn("cube time coordinates differ", out.getvalue())
+            self.assertNotIn("cube time coordinates differ",
+                             out_b.getvalue())
+            self.assertEqual(test_case_b, test_case_a)
+            filepaths = sorted(glob(self.tmp_dir_time + '*.nc'))
+            with mock.patch('cube_helper.cube_help.plan_equalisation',
+                            wraps=ch.plan_equalisation) as plan_equalisation:
+                with common._redirect_stdout(IO()):
+                    ch.load(filepaths[1:], plan=plan_file)
+                self.assertTrue(plan_equalisation.called)
+        finally:
+            if os.path.exists(plan_file):
+                os.remove(plan_file)
+
+    def test_load_incremental(self):
+        filepaths = sorted(glob(self.tmp_dir_time + '*.nc'))
+        with common._redirect_stdout(IO()):
+            expected = ch.load(filepaths)
+            existing = ch.load(filepaths[:2])
+            original = existing.copy()
+            with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw:
+                result = ch.load_incremental(existing, filepaths[2:])
+                self.assertEqual(load_raw.call_count, 1)
+        self.assertEqual(existing, original)
+        self.assertEqual(result.coord('time'), expected.coord('time'))
+        self.assertEqual(result, expected)
+        self.assertIs(ch.load_incremental(result, []), result)
+
+    def test_iter_load(self):
+        loaded = list(ch.iter_load(self.tmp_dir_time))
+        self.assertEqual(len(loaded), 3)
+        for path, cube in loaded:
+            self.assertTrue(path.startswith(self.tmp_dir_time))
+            self.assertIsInstance(cube, iris.cube.Cube)
+        filepaths = sorted(glob(self.tmp_dir_time + '*.nc'))
+        with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw:
+            generator = ch.iter_load(filepaths)
+            path, cube = next(generator)
+            self.assertEqual(path, filepaths[0])
+            self.assertEqual(load_raw.call_count, 1)
+            generator.close()
+        with mock.patch('cube_helper.cube_help.fix_known_issues') as fix:
+            loaded = list(ch.iter_load(filepaths, fix_known=True,
+                                       workers=2))
+            self.assertEqual(fix.call_count, 3)
+        self.assertEqual([path for path, _ in loaded], filepaths)
+
     def test_load_silent(self):
         glob_path = self.tmp_dir_time + '*.nc'
         filepaths = glob(glob_path)
@@ -5,12 +5,15 @@
 # See LICENSE in the root of the repository for full licensing details.
 from glob import glob
 import os
+import threading
 import unittest
+from unittest import mock
 import iris
 import iris.cube
 from iris.tests import stock
 import iris.time
 import cf_units
+import netCDF4
 from cube_helper.cube_loader import (load_from_dir,
                                      load_from_filelist,
                                      _parse_directory,
@@ -18,7 +21,26 @@ from cube_helper.cube_loader import (load_from_dir,
                                      file_sort_by_earliest_date,
                                      sort_by_earliest_date,
                                      _constraint_compatible,
-                                     _fix_partial_datetime)
+                                     _fix_partial_datetime,
+                                     _constraint_time_range,
+                                     _prune_paths,
+                                     _read_time_span,
+                                     _sort_paths,
+                                     parse_filename_dates,
+                                     DRS_DATE_PATTERN,
+                                     first_time_order,
+                                     _normalise_constraint,
+                                     _time_probe,
+                                     _header_time_coord,
+                                     _cached_time_header,
+                                     iter_files,
+                                     configure_cube_cache,
+                                     clear_cube_cache,
+                                     _CUBE_CACHE,
+                                     _FileHandlePool,
+                                     _NETCDF_LOCK,
+                                     _load_path,
+                                     _route_path)
 
 
 class TestCubeLoader(unittest.TestCase):
@@ -83,6 +105,378 @@ class TestCubeLoader(unittest.TestCase):
             self.assertIsInstance(name, str)
             self.assertTrue(os.path.exists(name))
 
+    def test_load_from_dir_workers(self):
+        serial_load, serial_names = load_from_dir(self.tmp_dir_time, '.nc')
+        for executor in ('thread', 'process'):
+            test_load, test_names = load_from_dir(self.tmp_dir_time, '.nc',
+                                                  workers=2,
+                                                  executor=executor)
+            self.assertEqual(test_names, serial_names)
+            for cube_a, cube_b in zip(test_load, serial_load):
+                self.assertEqual(cube_a.coord('time'), cube_b.coord('time'))
+
+    def test_load_from_filelist_workers(self):
+        filelist = glob(self.tmp_dir_time + '*.nc')
+        constraint = iris.Constraint(
+            time=iris.time.PartialDateTime(month=2))
+        serial_load, serial_names = load_from_filelist(filelist, '.nc',
+                                                       constraint)
+        test_load, test_names = load_from_filelist(filelist, '.nc',
+                                                   constraint, workers=3)
+        self.assertEqual(test_names, serial_names)
+        self.assertEqual(len(test_load), len(serial_load))
+        self.assertRaises(ValueError, load_from_filelist, filelist, '.nc',
+                          workers=2, executor='bananas')
+
+    def test_load_from_dir_pairing(self):
+        test_load, test_names = load_from_dir(self.tmp_dir_time, '.nc')
+        self.assertEqual(len(test_load), len(test_names))
+        for cube, name in zip(test_load, test_names):
+            self.assertEqual(cube.coord('time'),
+                             iris.load_cube(name).coord('time'))
+        origins = [cube.coord('time').units.origin for cube in test_load]
+        self.assertEqual(origins, ["hours since 1970-01-01 00:00:00",
+                                   "hours since 1980-01-01 00:00:00",
+                                   "hours since 1990-01-01 00:00:00"])
+
+    def test_constraint_time_range(self):
+        constraint = iris.Constraint(
+            time=iris.time.PartialDateTime(year=1970, month=1))
+        self.assertEqual(_constraint_time_range(constraint),
+                         ((1970, 1, 1, 0, 0, 0), (1970, 1, 31, 23, 59, 59)))
+        fixed = _fix_partial_datetime(constraint)
+        self.assertEqual(_constraint_time_range(fixed),
+                         _constraint_time_range(constraint))
+        combined = constraint & iris.Constraint(
+            time=iris.time.PartialDateTime(year=1970))
+        self.assertEqual(_constraint_time_range(combined),
+                         _constraint_time_range(constraint))
+        month_only = iris.Constraint(
+            time=iris.time.PartialDateTime(month=2))
+        self.assertIsNone(_constraint_time_range(month_only))
+        callable_constraint = iris.Constraint(
+            time=lambda cell: cell.point.year == 1970)
+        self.assertIsNone(_constraint_time_range(callable_constraint))
+
+    def test_prune_paths(self):
+        paths = sorted(glob(self.tmp_dir_time + '*.nc'))
+        spans = [_read_time_span(path) for path in paths]
+        self.assertNotIn(None, spans)
+        start = spans[0][0]
+        constraint = iris.Constraint(
+            time=iris.time.PartialDateTime(year=start[0], month=start[1],
+                                           day=start[2]))
+        kept = _prune_paths(paths, constraint)
+        self.assertIn(paths[0], kept)
+        self.assertLess(len(kept), len(paths))
+        for path in kept:
+            cube = iris.load_cube(path)
+            self.assertIsNotNone(cube.extract(
+                _fix_partial_datetime(constraint)))
+        month_only = iris.Constraint(
+            time=iris.time.PartialDateTime(month=2))
+        self.assertEqual(_prune_paths(paths, month_only), paths)
+
+    def test_read_time_span_unreadable(self):
+        path = self.tmp_dir + 'bad_calendar.nc'
+        with netCDF4.Dataset(path, 'w') as dataset:
+            dataset.createDimension('time', 2)
+            time_var = dataset.createVariable('time', 'f8', ('time',))
+            time_var.standard_name = 'time'
+            time_var.units = 'hours since 1970-01-01 00:00:00'
+            time_var.calendar = 'bananas'
+            time_var[:] = [0., 1.]
+        try:
+            self.assertIsNone(_read_time_span(path))
+        finally:
+            os.remove(path)
+
+    def test_time_header_read_once(self):
+        path = sorted(glob(self.tmp_dir_time + '*.nc'))[0]
+        _cached_time_header.cache_clear()
+        span = _read_time_span(path)
+        time_coord = _header_time_coord(path)
+        self.assertEqual(_cached_time_header.cache_info().misses, 1)
+        self.assertEqual(span[0], _read_time_span(path)[0])
+        self.assertEqual(time_coord.units,
+                         iris.load_cube(path).coord('time').units)
+        os.utime(path, (0, 0))
+        _read_time_span(path)
+        self.assertEqual(_cached_time_header.cache_info().misses, 2)
+
+    def test_parse_filename_dates(self):
+        filename = '/data/tas_Amon_UKESM1-0-LL_historical_r1i1p1f2_gn_' \
+                   '185001-194912.nc'
+        self.assertEqual(parse_filename_dates(filename),
+                         ((1850, 1, 1, 0, 0, 0),
+                          (1949, 12, 31, 23, 59, 59)))
+        self.assertEqual(parse_filename_dates('pr_day_x_19900101-19901231.nc'),
+                         ((1990, 1, 1, 0, 0, 0),
+                          (1990, 12, 31, 23, 59, 59)))
+        self.assertIsNone(parse_filename_dates('temp_1.nc'))
+        pattern = r'(?P<start>\d{4})_(?P<end>\d{4})\.pp$'
+        self.assertEqual(parse_filename_dates('run_1970_1979.pp', pattern),
+                         ((1970, 1, 1, 0, 0, 0),
+                          (1979, 12, 31, 23, 59, 59)))
+
+    def test_filename_dates_sort_and_prune(self):
+        # The files do not exist, so they can only be sorted and pruned
+        # by their names.
+        paths = ['/missing/tas_Amon_m_e_r1_gn_195001-201412.nc',
+                 '/missing/tas_Amon_m_e_r1_gn_185001-194912.nc']
+        patterns = [DRS_DATE_PATTERN]
+        self.assertEqual(_sort_paths(paths, patterns=patterns), paths[::-1])
+        constraint = iris.Constraint(
+            time=iris.time.PartialDateTime(year=1960))
+        self.assertEqual(_prune_paths(paths, constraint, patterns=patterns),
+                         paths[:1])
+
+    def test_first_time_order(self):
+        base_cube = stock.realistic_3d()
+        cubes = [base_cube[4:], base_cube[0:2], base_cube[2:4]]
+        # Same time origin for every cube, so only the first time point
+        # can tell them apart.
+        self.assertEqual(list(first_time_order(cubes)), [1, 2, 0])
+        cubes[0].coord('time').convert_units(
+            cf_units.Unit('days since 2000-01-01', 'gregorian'))
+        self.assertEqual(list(first_time_order(cubes)), [1, 2, 0])
+        lazy_cube = cubes[0].copy()
+        lazy_cube.coord('time').points = lazy_cube.coord('time').lazy_points()
+        self.assertEqual(list(first_time_order([lazy_cube] + cubes[1:])),
+                         [1, 2, 0])
+        cubes[1].coord('time').units = cf_units.Unit(
+            cubes[1].coord('time').units.origin, '360_day')
+        self.assertEqual(len(first_time_order(cubes)), 3)
+
+    def test_load_from_filelist_sort_time(self):
+        filelist = glob(self.tmp_dir + '*.nc')
+        test_load, test_names = load_from_filelist(filelist, '.nc',
+                                                   sort='time')
+        self.assertEqual(test_names, [self.tmp_dir + self.temp_1,
+                                      self.tmp_dir + self.temp_2,
+                                      self.tmp_dir + self.temp_3])
+        self.assertRaises(ValueError, load_from_filelist, filelist, '.nc',
+                          sort='bananas')
+
+    def test_time_probe(self):
+        path = glob(self.tmp_dir_time + '*.nc')[0]
+        probe = _time_probe(path)
+        self.assertEqual(probe.coord('time').units,
+                         iris.load_cube(path).coord('time').units)
+        self.assertEqual(probe.shape, (2,))
+
+    def test_time_probe_repeated_times(self):
+        path = self.tmp_dir + 'repeated_times.nc'
+        with netCDF4.Dataset(path, 'w') as dataset:
+            dataset.createDimension('time', 2)
+            time_var = dataset.createVariable('time', 'f8', ('time',))
+            time_var.standard_name = 'time'
+            time_var.units = 'hours since 1970-01-01 00:00:00'
+            time_var.calendar = 'gregorian'
+            time_var[:] = [0., 0.]
+            data_var = dataset.createVariable('tas', 'f4', ('time',))
+            data_var.standard_name = 'air_temperature'
+            data_var.units = 'K'
+            data_var[:] = [280., 281.]
+        try:
+            self.assertIsNone(_header_time_coord(path))
+            probe = _time_probe(path)
+            self.assertEqual(list(probe.coord('time').points), [0., 0.])
+        finally:
+            os.remove(path)
+
+    def test_normalise_constraint(self):
+        filelist = glob(self.tmp_dir_time + '*.nc')
+        constraint = iris.Constraint(
+            time=iris.time.PartialDateTime(month=2))
+        normalised = _normalise_constraint(constraint, filelist[0])
+        with mock.patch('cube_helper.cube_loader._constraint_compatible') \
+                as compatible:
+            self.assertIs(_normalise_constraint(constraint, filelist[0]),
+                          normalised)
+            self.assertFalse(compatible.called)
+        with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw:
+            load_from_filelist(filelist, '.nc', constraint)
+            self.assertEqual(load_raw.call_count, len(filelist))
+        name_only = iris.Constraint('air_potential_temperature')
+        self.assertIs(_normalise_constraint(name_only, filelist[0]),
+                      name_only)
+
+    def test_iter_files(self):
+        nested_dir = self.tmp_dir + 'model/exp/'
+        os.makedirs(nested_dir)
+        try:
+            iris.save(iris.load_cube(self.tmp_dir + self.temp_1),
+                      nested_dir + 'nested.nc')
+            flat = list(iter_files(self.tmp_dir, '.nc'))
+            self.assertEqual(flat, [self.tmp_dir + self.temp_1,
+                                    self.tmp_dir + self.temp_2,
+                                    self.tmp_dir + self.temp_3])
+            nested = list(iter_files(self.tmp_dir, '.nc', recursive=True))
+            self.assertEqual(nested, flat + [nested_dir + 'nested.nc'])
+            self.assertEqual(list(iter_files(self.tmp_dir, '.nc',
+                                             recursive=True, max_depth=1)),
+                             flat)
+            self.assertEqual(list(iter_files(self.tmp_dir, '.nc',
+                                             recursive=True,
+                                             include='model/*')),
+                             [nested_dir + 'nested.nc'])
+            self.assertEqual(list(iter_files(self.tmp_dir, '.nc',
+                                             recursive=True,
+                                             exclude=['model', 'temp_1*'])),
+                             flat[1:])
+            test_load, test_names = load_from_dir(self.tmp_dir, '.nc',
+                                                  recursive=True,
+                                                  workers=2)
+            self.assertEqual(len(test_load), 4)
+            self.assertIn(nested_dir + 'nested.nc', test_names)
+        finally:
+            os.remove(nested_dir + 'nested.nc')
+            os.removedirs(nested_dir)
+
+    def test_iter_files_symlinks(self):
+        version_dir = self.tmp_dir + 'tas/v20190101/'
+        os.makedirs(version_dir)
+        os.symlink('v20190101', self.tmp_dir + 'tas/latest')
+        os.symlink('..', version_dir + 'parent')
+        try:
+            iris.save(iris.load_cube(self.tmp_dir + self.temp_1),
+                      version_dir + 'tas.nc')
+            self.assertEqual(list(iter_files(self.tmp_dir + 'tas/', '.nc',
+                                             recursive=True)),
+                             [version_dir + 'tas.nc'])
+            self.assertEqual(list(iter_files(self.tmp_dir + 'tas/latest/',
+                                             '.nc')),
+                             [self.tmp_dir + 'tas/latest/tas.nc'])
+        finally:
+            os.remove(version_dir + 'tas.nc')
+            os.remove(version_dir + 'parent')
+            os.remove(self.tmp_dir + 'tas/latest')
+            os.removedirs(version_dir)
+
+    def test_cube_cache(self):
+        filelist = sorted(glob(self.tmp_dir + '*.nc'))
+        configure_cube_cache(max_entries=2)
+        try:
+            first_load, _ = load_from_filelist(filelist[:2], '.nc')
+            with mock.patch('iris.load_raw',
+                            wraps=iris.load_raw) as load_raw:
+                second_load, _ = load_from_filelist(filelist, '.nc')
+                self.assertEqual(load_raw.call_count, 1)
+            self.assertEqual(second_load[0], first_load[0])
+            second_load[0].attributes['modified'] = 'yes'
+            third_load, _ = load_from_filelist(filelist[1:2], '.nc')
+            self.assertNotIn('modified', third_load[0].attributes)
+            self.assertEqual(len(_CUBE_CACHE._entries), 2)
+            list_load, _ = load_from_filelist(
+                filelist[:1], '.nc', ['air_potential_temperature'])
+            self.assertEqual(len(list_load), 1)
+            self.assertIsNone(_CUBE_CACHE.key(filelist[0], [{}]))
+            configure_cube_cache(max_entries=2, max_bytes=0)
+            self.assertEqual(len(_CUBE_CACHE._entries), 0)
+        finally:
+            configure_cube_cache(max_entries=0)
+            clear_cube_cache()
+
+    def test_file_pool(self):
+        filelist = sorted(glob(self.tmp_dir + '*.nc'))
+        pool = _FileHandlePool(max_open_files=2)
+        try:
+            with mock.patch('netCDF4.Dataset',
+                            wraps=netCDF4.Dataset) as dataset:
+                for path in filelist[:2] * 3:
+                    with pool.dataset(path) as handle:
+                        self.assertEqual(handle.filepath(), path)
+                self.assertEqual(dataset.call_count, 2)
+                with pool.dataset(filelist[2]):
+                    self.assertEqual(len(pool._handles), 2)
+                self.assertEqual(sorted(pool._handles), filelist[1:])
+                with pool.dataset(filelist[1]):
+                    pool.close()
+                self.assertEqual(pool._handles, {})
+                with pool.dataset(filelist[0]):
+                    pass
+                self.assertEqual(dataset.call_count, 4)
+            os.remove(filelist[0])
+            iris.save(stock.realistic_3d(), filelist[0])
+            with pool.dataset(filelist[0]) as handle:
+                self.assertEqual(len(handle.variables['time']), 7)
+        finally:
+            pool.close()
+
+    def test_loaded_data_uses_file_pool(self):
+        filelist = sorted(glob(self.tmp_dir + '*.nc'))
+        cubes, names = load_from_filelist(filelist, '.nc')
+        with mock.patch('netCDF4.Dataset',
+                        wraps=netCDF4.Dataset) as dataset:
+            for cube in cubes:
+                cube.core_data().compute()
+                cube.core_data().compute()
+            self.assertEqual(dataset.call_count, 0)
+        for cube, name in zip(cubes, names):
+            self.assertTrue(cube.has_lazy_data())
+            self.assertTrue((cube.data == iris.load_cube(name).data).all())
+
+    def test_file_pool_lock(self):
+        path = sorted(glob(self.tmp_dir + '*.nc'))[0]
+
+        def try_lock():
+            acquired.append(_NETCDF_LOCK.acquire(False))
+            if acquired[-1]:
+                _NETCDF_LOCK.release()
+
+        for max_open_files in (0, 2):
+            pool = _FileHandlePool(max_open_files=max_open_files)
+            acquired = []
+            with pool.dataset(path):
+                thread = threading.Thread(target=try_lock)
+                thread.start()
+                thread.join()
+                pool.close()
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            self.assertEqual(acquired, [False, True])
+
+    def test_load_path_reads_file_once(self):
+        path = self.tmp_dir + 'multi_var.nc'
+        cube_a = iris.load_cube(self.tmp_dir + self.temp_1)
+        cube_b = cube_a.copy()
+        cube_b.rename('air_temperature')
+        cube_b.var_name = 'air_temperature'
+        iris.save([cube_a, cube_b], path)
+        try:
+            with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw:
+                cubes = _load_path(path)
+                self.assertEqual(load_raw.call_count, 1)
+            self.assertEqual(sorted(cube.name() for cube in cubes),
+                             ['air_potential_temperature', 'air_temperature'])
+            single = _load_path(self.tmp_dir + self.temp_1)
+            self.assertEqual(len(single), 1)
+            constraint = iris.Constraint('air_temperature')
+            self.assertEqual([cube.name() for cube in
+                              _load_path(path, constraint)],
+                             ['air_temperature'])
+        finally:
+            os.remove(path)
+
+    def test_route_path_copies_shared_cubes(self):
+        path = self.tmp_dir + 'multi_var.nc'
+        cube_a = iris.load_cube(self.tmp_dir + self.temp_1)
+        cube_b = cube_a.copy()
+        cube_b.rename('air_temperature')
+        cube_b.var_name = 'air_temperature'
+        iris.save([cube_a, cube_b], path)
+        try:
+            routed = _route_path(path, {'all': None,
+                                        'tas': 'air_temperature'})
+            tas = [cube for cube in routed['all']
+                   if cube.name() == 'air_temperature']
+            self.assertEqual(routed['tas'], tas)
+            self.assertIsNot(routed['tas'][0], tas[0])
+        finally:
+            os.remove(path)
+
     def test_parse_directory(self):
         directory = 'test_data/realistic_3d/realistic_3d_0.nc'
         self.assertEqual(_parse_directory(directory),
@@ -0,0 +1,114 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+import json
+import os
+import shutil
+import unittest
+from glob import glob
+from unittest import mock
+import netCDF4
+import numpy as np
+import iris
+import iris.time
+from iris.tests import stock
+import cf_units
+import cube_helper as ch
+from cube_helper.reference import save_reference, load_reference
+
+
+class TestReference(unittest.TestCase):
+
+    def setUp(self):
+        super(TestReference, self).setUp()
+        abs_path = os.path.dirname(os.path.abspath(__file__))
+        self.tmp_dir_reference = abs_path + '/' + 'tmp_dir_reference/'
+        if not os.path.exists(self.tmp_dir_reference):
+            os.mkdir(self.tmp_dir_reference)
+        base_cube = stock.realistic_3d()
+        cube_1 = base_cube[0:2]
+        cube_2 = base_cube[2:4]
+        cube_3 = base_cube[4:]
+        new_time = cf_units.Unit('hours since 1980-01-01 00:00:00',
+                                 'gregorian')
+        cube_2.dim_coords[0].convert_units(new_time)
+        new_time = cf_units.Unit('hours since 1990-01-01 00:00:00',
+                                 'gregorian')
+        cube_3.dim_coords[0].convert_units(new_time)
+        for i, cube in enumerate([cube_1, cube_2, cube_3]):
+            iris.save(cube, self.tmp_dir_reference +
+                      'temp_{}.nc'.format(i))
+        self.reference_file = self.tmp_dir_reference + 'ref.json'
+
+    def test_round_trip(self):
+        cube = ch.load(self.tmp_dir_reference)
+        save_reference(cube, self.tmp_dir_reference, self.reference_file)
+        with mock.patch('iris.load_raw') as load_raw:
+            rebuilt = load_reference(self.reference_file)
+            self.assertFalse(load_raw.called)
+        with open(self.reference_file) as fh:
+            self.assertEqual(json.load(fh)['version'], 2)
+        self.assertTrue(rebuilt.has_lazy_data())
+        self.assertIsInstance(rebuilt.core_data().compute(),
+                              np.ma.MaskedArray)
+        self.assertEqual(rebuilt.metadata, cube.metadata)
+        self.assertEqual(rebuilt.coords(), cube.coords())
+        self.assertEqual(rebuilt.coord_dims('time'), cube.coord_dims('time'))
+        np.testing.assert_array_equal(rebuilt.data, cube.data)
+        np.testing.assert_array_equal(rebuilt[1:5, 2, ::2].data,
+                                      cube[1:5, 2, ::2].data)
+
+    def test_time_subset(self):
+        constraint = iris.Constraint(
+            time=lambda cell: cell.point >= iris.time.PartialDateTime(
+                year=2014, month=12, day=21, hour=9))
+        cube = ch.load(self.tmp_dir_reference, constraints=constraint)
+        save_reference(cube, self.tmp_dir_reference, self.reference_file)
+        rebuilt = load_reference(self.reference_file)
+        self.assertEqual(rebuilt.shape, cube.shape)
+        np.testing.assert_array_equal(rebuilt.data, cube.data)
+
+    def test_file_pool(self):
+        cube = ch.load(self.tmp_dir_reference)
+        save_reference(cube, self.tmp_dir_reference, self.reference_file)
+        ch.configure_file_pool(max_open_files=2)
+        try:
+            rebuilt = load_reference(self.reference_file)
+            with mock.patch('netCDF4.Dataset',
+                            wraps=netCDF4.Dataset) as dataset:
+                np.testing.assert_array_equal(rebuilt.data, cube.data)
+                np.testing.assert_array_equal(rebuilt.data, cube.data)
+                self.assertLessEqual(dataset.call_count, 3)
+        finally:
+            ch.configure_file_pool()
+
+    def test_changed_source(self):
+        cube = ch.load(self.tmp_dir_reference)
+        save_reference(cube, self.tmp_dir_reference, self.reference_file)
+        os.utime(self.tmp_dir_reference + 'temp_0.nc', (0, 0))
+        self.assertRaises(ValueError, load_reference, self.reference_file)
+        load_reference(self.reference_file, check=False)
+
+    def test_load_incremental(self):
+        cube = ch.load(self.tmp_dir_reference)
+        filepaths = sorted(glob(self.tmp_dir_reference + '*.nc'))
+        existing = ch.load(filepaths[:2])
+        save_reference(existing, filepaths[:2], self.reference_file)
+        with mock.patch('iris.load_raw', wraps=iris.load_raw) as load_raw:
+            extended = ch.load_incremental(self.reference_file,
+                                           self.tmp_dir_reference)
+            self.assertEqual(load_raw.call_count, 1)
+        self.assertEqual(extended.coord('time'), cube.coord('time'))
+        rebuilt = load_reference(self.reference_file)
+        self.assertEqual(rebuilt.coord('time'), cube.coord('time'))
+        np.testing.assert_array_equal(rebuilt.data, cube.data)
+
+    def tearDown(self):
+        super(TestReference, self).tearDown()
+        shutil.rmtree(self.tmp_dir_reference)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# (C) Crown Copyright, Met Office. All rights reserved.
+#
+# This file is part of cube_helper and is released under the
+# BSD 3-Clause license.
+# See LICENSE in the root of the repository for full licensing details.
+import os
+import shutil
+import unittest
+from unittest import mock
+import iris
+import iris.cube
+from iris.tests import stock
+import cube_helper as ch
+from cube_helper.result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        super(TestResultCache, self).setUp()
+        abs_path = os.path.dirname(os.path.abspath(__file__))
+        self.tmp_dir_data = abs_path + '/' + 'tmp_dir_cache_data/'
+        self.tmp_dir_cache = abs_path + '/' + 'tmp_dir_cache/'
+        if not os.path.exists(self.tmp_dir_data):
+            os.mkdir(self.tmp_dir_data)
+        base_cube = stock.realistic_3d()
+        iris.save(base_cube[0:2], self.tmp_dir_data + 'temp_1.nc')
+        iris.save(base_cube[2:4], self.tmp_dir_data + 'temp_2.nc')
+        iris.save(base_cube[4:], self.tmp_dir_data + 'temp_3.nc')
+        self.cache = ResultCache(self.tmp_dir_cache)
+
+    def test_load_cache_hit(self):
+        result = ch.load(self.tmp_dir_data, cache=self.cache)
+        with mock.patch('cube_helper.cube_help.load_from_dir') as loader:
+            cached = ch.load(self.tmp_dir_data, cache=self.cache)
+            self.assertFalse(loader.called)
+        self.assertIsInstance(cached, iris.cube.Cube)
+        self.assertTrue(cached.has_lazy_data())
+        self.assertEqual(cached, result)
+
+    def test_key_changes_with_files(self):
+        paths = [self.tmp_dir_data + 'temp_1.nc',
+                 self.tmp_dir_data + 'temp_2.nc']
+        key = self.cache.key(paths)
+        self.assertEqual(key, self.cache.key(paths[::-1]))
+        self.assertNotEqual(key, self.cache.key(paths[:1]))
+        self.assertNotEqual(key, self.cache.key(
+            paths, iris.Constraint('air_potential_temperature')))
+        self.assertIsNone(self.cache.key(
+            paths, iris.Constraint(time=lambda cell: True)))
+        os.utime(paths[0], (0, 0))
+        self.assertNotEqual(key, self.cache.key(paths))
+
+    def test_eviction_and_invalidation(self):
+        cube = stock.realistic_3d()
+        self.cache.put('a', cube)
+        self.cache.put('b', cube)
+        self.assertIsNotNone(self.cache.get('a'))
+        self.cache.invalidate('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get('b'))
+        small_cache = ResultCache(self.tmp_dir_cache, max_bytes=1)
+        small_cache.put('c', cube)
+        self.assertIsNone(small_cache.get('c'))
+
+    def test_entry_evicted_after_read(self):
+        self.cache.put('a', stock.realistic_3d())
+        self.assertEqual([name for name in os.listdir(self.tmp_dir_cache)
+                          if name.endswith('.tmp')], [])
+        with mock.patch('os.utime', side_effect=FileNotFoundError):
+            self.assertIsNotNone(self.cache.get('a'))
+
+    def test_unreadable_entry(self):
+        self.cache.put('a', stock.realistic_3d())
+        entry = self.cache._path('a')
+        # A pickle of a class that no longer exists.
+        with open(entry, 'wb') as fh:
+            fh.write(b'ccube_helper.missing\nCube\nq\x00.')
+        self.assertIsNone(self.cache.get('a'))
+        self.assertFalse(os.path.exists(entry))
+
+    def tearDown(self):
+        super(TestResultCache, self).tearDown()
+        shutil.rmtree(self.tmp_dir_data)
+        shutil.rmtree(self.tmp_dir_cache)
+
+
+if __name__ == '__main__':
+    unittest.main()